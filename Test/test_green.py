@@ -1,12 +1,21 @@
 import re
+import pytest
 
-def test_filename_validation_green():
+# Case-sensitive; callers upper-case the filename before matching
+_FILENAME_RE = re.compile(r'CLINICALDATA_\d{14}\.CSV')
+
+@pytest.mark.parametrize("filename,expected", [
+    ("CLINICALDATA_20240101120000.CSV", True),
+    ("clinicaldata_20240101120000.csv", True),
+    ("wrong.csv", False),
+    ("CLINICALDATA_20240101.CSV", False),
+    ("CLINICALDATA_20240101120000.TXT", False),
+    ("CLINICALDATA_20240101120000.CSV\n", False),
+])
+def test_filename_validation_green(filename, expected):
     """GREEN: Fix the filename test"""
-    filename = "CLINICALDATA_20240101120000.CSV"
-    pattern = r'^CLINICALDATA_\d{14}\.CSV$'
-    
     # Correct assertion
-    assert re.match(pattern, filename, re.IGNORECASE) is not None
+    assert (_FILENAME_RE.fullmatch(filename.upper()) is not None) == expected
 
 def test_dosage_validation_green():
     """GREEN: Fix the dosage test"""
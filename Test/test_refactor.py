@@ -1,22 +1,32 @@
 
-import csv
-import tempfile
-import re
+
+# Maps ASCII digits to 0x00 and every other byte to 0xFF
+_DIGIT_TABLE = bytes(0x00 if 0x30 <= b <= 0x39 else 0xFF for b in range(256))
+_ALL_DIGITS = bytes(14)
 
 class ClinicalDataValidator:
     """Refactored validator class"""
     
     @staticmethod
     def is_valid_filename(filename):
-        pattern = r'^CLINICALDATA_\d{14}\.CSV$'
-        return re.match(pattern, filename, re.IGNORECASE) is not None
+        # CLINICALDATA_\d{14}\.CSV unrolled at fixed offsets:
+        # [0:12] prefix, [12] '_', [13:27] digits, [27] '.', [28:31] extension
+        return (len(filename) == 31
+                and filename[12] == '_'
+                and filename[27] == '.'
+                and filename[:12].upper() == 'CLINICALDATA'
+                and filename[28:].upper() == 'CSV'
+                and filename.isascii()
+                and filename[13:27].encode('ascii').translate(_DIGIT_TABLE) == _ALL_DIGITS)
     
     @staticmethod
     def is_valid_dosage(dosage):
-        try:
-            return int(dosage) > 0
-        except ValueError:
-            return False
+        # '-' and non-digits fail isdigit(), so bad input never raises;
+        # an all-zero string is the only digit-only value that is not positive
+        return (isinstance(dosage, str)
+                and dosage.isascii()
+                and dosage.isdigit()
+                and dosage.strip('0') != '')
 
 def test_refactored_validator():
     """REFACTOR: Test the clean validator class"""
@@ -30,13 +40,3 @@ def test_refactored_validator():
     assert not validator.is_valid_filename("wrong.csv")
     assert not validator.is_valid_dosage("-10")
     assert not validator.is_valid_dosage("abc")
-
-def test_dosage_validation_green():
-    """GREEN: Fix the dosage test"""
-    dosage = "100"
-    
-    # Correct assertion
-    assert int(dosage) > 0
-
-
-    
@@ -0,0 +1,12 @@
+# conftest.py
+import pytest
+from helix import ClinicalDataValidator
+
+
+@pytest.fixture(scope="class")
+def shared_validator(tmp_path_factory):
+    """One validator for a whole test class, for tests that never change its directories"""
+    root = tmp_path_factory.mktemp("shared")
+    validator = ClinicalDataValidator(root / "Downloads", root / "Archive", root / "Errors")
+    yield validator
+    validator.close()
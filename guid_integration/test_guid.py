@@ -1,100 +1,134 @@
 # test_guid.py
 import pytest
-from helix import ClinicalDataValidator
-from pathlib import Path
-import tempfile
-import os
-from unittest.mock import Mock, patch, MagicMock
+import responses
+from requests.exceptions import Timeout
+from helix import ClinicalDataValidator, UUID_API_URL, GUID_BATCH_SIZE
 import uuid
+import collections
+import gc
+import helix
+
+API_BATCH_URL = f"{UUID_API_URL}/count/{GUID_BATCH_SIZE}"
+
+@pytest.fixture(autouse=True)
+def mocked_api():
+    """Fake HTTP layer; unregistered URLs raise, so no test reaches the real API"""
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+        yield rsps
+
+@pytest.fixture
+def validator(shared_validator, monkeypatch):
+    """Shared validator with fresh GUID cache state, so each test sees its own responses"""
+    monkeypatch.setattr(ClinicalDataValidator, "_guid_cache", collections.deque())
+    monkeypatch.setattr(ClinicalDataValidator, "_api_healthy", True)
+    # No background refills unless a test asks for them
+    monkeypatch.setattr(helix, "GUID_REFILL_THRESHOLD", 0)
+    return shared_validator
 
 class TestGUIDGeneration:
     """Test GUID generation functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.temp_dir = tempfile.mkdtemp()
-        self.download_dir = Path(self.temp_dir) / "Downloads"
-        self.archive_dir = Path(self.temp_dir) / "Archive"
-        self.error_dir = Path(self.temp_dir) / "Errors"
-        
-        # Create validator instance
-        self.validator = ClinicalDataValidator(
-            self.download_dir,
-            self.archive_dir,
-            self.error_dir
-        )
-    
-    def teardown_method(self):
-        """Clean up after tests"""
-        import shutil
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-    
-    @patch('helix.requests.get')
-    def test_generate_guid_api_success(self, mock_get):
+    def test_generate_guid_api_success(self, validator, mocked_api):
         """Test successful API GUID generation"""
-        # Mock successful API response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = ["api-generated-uuid-1234"]
-        mock_get.return_value = mock_response
+        # Fake successful API response
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["api-generated-uuid-1234"])
         
-        guid = self.validator._generate_guid()
+        guid = validator._generate_guid()
         
-        # Verify API was called
-        mock_get.assert_called_once_with(
-            "https://www.uuidtools.com/api/generate/v4",
-            timeout=5
-        )
+        # Verify API was called once, for a whole batch
+        assert len(mocked_api.calls) == 1
+        assert mocked_api.calls[0].request.url == API_BATCH_URL
         
         # Verify returned GUID
         assert guid == "api-generated-uuid-1234"
     
-    @patch('helix.requests.get')
-    def test_generate_guid_api_failure_fallback(self, mock_get):
+    def test_generate_guid_served_from_pool(self, validator, mocked_api):
+        """Test a single API batch serves several GUIDs"""
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["uuid-1", "uuid-2", "uuid-3"])
+        
+        guids = [validator._generate_guid() for _ in range(3)]
+        
+        # Only one round-trip for the whole batch
+        assert len(mocked_api.calls) == 1
+        assert guids == ["uuid-1", "uuid-2", "uuid-3"]
+    
+    def test_generate_guid_api_failure_fallback(self, validator, mocked_api):
         """Test fallback to local UUID when API fails"""
-        # Mock API failure (timeout)
-        mock_get.side_effect = Exception("API failed")
-        
-        # Mock uuid.uuid4 to return predictable value
-        with patch('helix.uuid.uuid4') as mock_uuid:
-            test_uuid = uuid.UUID('12345678-1234-1234-1234-123456789012')
-            mock_uuid.return_value = test_uuid
-            
-            guid = self.validator._generate_guid()
-        
-        # Should use fallback UUID
-        assert guid == str(test_uuid)
+        # Every API call fails
+        mocked_api.add(responses.GET, API_BATCH_URL, body=Exception("API failed"))
+        
+        guid = validator._generate_guid()
+        
+        # Should use a well-formed, unique fallback UUID
+        assert str(uuid.UUID(guid)) == guid
+        assert validator._generate_guid() != guid
         # API should have been called (and failed)
-        assert mock_get.called
+        assert len(mocked_api.calls) > 0
     
-    @patch('helix.requests.get')
-    def test_generate_guid_api_timeout_retry(self, mock_get):
-        """Test retry logic on timeout"""
-        from requests.exceptions import Timeout
+    def test_generate_guid_skips_api_after_failure(self, validator, mocked_api):
+        """Test a failed fetch switches the rest of the run to local GUIDs"""
+        mocked_api.add(responses.GET, API_BATCH_URL, body=Exception("API failed"))
         
-        # First call times out, second succeeds
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = ["retry-success-uuid"]
+        validator._generate_guid(max_retries=1)
+        calls_after_failure = len(mocked_api.calls)
+        validator._generate_guid(max_retries=1)
+        
+        assert ClinicalDataValidator._api_healthy is False
+        assert len(mocked_api.calls) == calls_after_failure
+    
+    def test_generate_guid_refills_in_background(self, validator, mocked_api, monkeypatch):
+        """Test the cache is topped up once it runs low"""
+        monkeypatch.setattr(helix, "GUID_REFILL_THRESHOLD", 10)
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["uuid-1"])
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["uuid-2", "uuid-3"])
+        
+        assert validator._generate_guid() == "uuid-1"
+        # The refill thread holds the lock until its fetch has finished
+        with ClinicalDataValidator._refill_lock:
+            pass
+        
+        assert len(mocked_api.calls) == 2
+        assert list(ClinicalDataValidator._guid_cache) == ["uuid-2", "uuid-3"]
+    
+    def test_log_error_records_guid(self, validator, mocked_api):
+        """Test rejected files are logged with a GUID"""
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["error-guid"])
+        
+        guid, log_entry = validator._log_error("bad.csv", "Invalid header")
+        
+        assert guid == "error-guid"
+        assert log_entry in (validator.error_dir / "error_report.log").read_text()
+        assert "GUID: error-guid | Source: API | File: bad.csv | Error: Invalid header" in log_entry
+    
+    def test_log_error_records_fallback_source(self, validator, monkeypatch):
+        """Test a locally generated GUID is logged as a fallback"""
+        monkeypatch.setattr(ClinicalDataValidator, "_api_healthy", False)
         
-        mock_get.side_effect = [Timeout("Timeout"), mock_response]
+        guid, log_entry = validator._log_error("bad.csv", "Invalid header")
+        
+        assert f"GUID: {guid} | Source: Local Fallback | File: bad.csv" in log_entry
+    
+    def test_generate_guid_api_timeout_retry(self, validator, mocked_api):
+        """Test retry logic on timeout"""
+        # First call times out, second succeeds
+        mocked_api.add(responses.GET, API_BATCH_URL, body=Timeout("Timeout"))
+        mocked_api.add(responses.GET, API_BATCH_URL, json=["retry-success-uuid"])
         
-        guid = self.validator._generate_guid()
+        guid = validator._generate_guid()
         
         # Should retry and succeed
-        assert mock_get.call_count == 2
+        assert len(mocked_api.calls) == 2
         assert guid == "retry-success-uuid"
     
-    def test_log_api_failure(self):
+    def test_log_api_failure(self, validator):
         """Test API failure logging"""
         error_message = "Test API failure"
         
         # Call the method
-        self.validator._log_api_failure(error_message)
+        validator._log_api_failure(error_message)
         
         # Check log file was created
-        log_path = self.error_dir / "api_failures.log"
+        log_path = validator.error_dir / "api_failures.log"
         assert log_path.exists()
         
         # Check log content
@@ -103,4 +137,39 @@ class TestGUIDGeneration:
             assert "API Failure" in content
             assert error_message in content
     
-  
+    def test_log_api_failure_after_close_keeps_validator_closed(self, tmp_path):
+        """Test a late failure from a refill thread is logged without reopening the log"""
+        validator = ClinicalDataValidator(tmp_path / "Downloads", tmp_path / "Archive", tmp_path / "Errors")
+        validator._log_api_failure("before close")
+        validator.close()
+        
+        validator._log_api_failure("after close")
+        
+        lines = (tmp_path / "Errors" / "api_failures.log").read_text().splitlines()
+        assert lines[-1].endswith("API Failure: after close")
+        assert validator._api_log is None
+    
+    def test_api_log_closed_when_validator_is_collected(self, tmp_path):
+        """Test a validator that is never closed doesn't leak its API log file"""
+        validator = ClinicalDataValidator(tmp_path / "Downloads", tmp_path / "Archive", tmp_path / "Errors")
+        validator._log_api_failure("unclosed")
+        api_log = validator._api_log
+        
+        del validator
+        gc.collect()
+        
+        assert api_log.closed
+    
+    def test_log_api_failure_appends(self, validator):
+        """Test repeated failures append to the same log"""
+        log_path = validator.error_dir / "api_failures.log"
+        before = log_path.read_text().splitlines() if log_path.exists() else []
+        
+        validator._log_api_failure("first")
+        validator._log_api_failure("second")
+        
+        lines = log_path.read_text().splitlines()
+        assert lines[:len(before)] == before
+        assert len(lines) == len(before) + 2
+        assert lines[-2].endswith("API Failure: first")
+        assert lines[-1].endswith("API Failure: second")
@@ -3,15 +3,108 @@ from tkinter import ttk, messagebox, scrolledtext, filedialog
 import ftplib
 import csv
 import os
-import re
 import uuid
 from datetime import datetime
 from pathlib import Path
 import threading
 import queue
 import sys
+import subprocess
 import requests
+from requests.adapters import HTTPAdapter
 import time
+import io
+import collections
+import itertools
+import functools
+import concurrent.futures
+import contextlib
+import weakref
+import dataclasses
+
+# Fixed parts of CLINICALDATA_YYYYMMDDHHMMSS.CSV; the 14-digit timestamp sits between them
+_FILENAME_PREFIX = "CLINICALDATA_"
+_FILENAME_SUFFIX = ".CSV"
+
+# Clinical CSV layout
+_EXPECTED_FIELDS = ["PatientID", "TrialCode", "DrugCode", "Dosage_mg",
+                    "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"]
+_VALID_OUTCOMES = frozenset({"Improved", "No Change", "Worsened"})
+_OUTCOME_CHOICES = "Improved, No Change, Worsened"  # fixed order for messages
+
+# GUID service endpoint and number of GUIDs requested per round-trip
+UUID_API_URL = "https://www.uuidtools.com/api/generate/v4"
+GUID_BATCH_SIZE = 100
+
+# The GUID cache is topped up in the background once it drops below this
+GUID_REFILL_THRESHOLD = 10
+
+# Local fallback GUIDs are a random per-process base plus a counter
+_uuid_base = str(uuid.uuid4())[:24]
+_uuid_ctr = itertools.count()
+
+# FTP downloads read the data socket in 1 MiB blocks and write through an 8 MiB buffer
+FTP_BLOCK_SIZE = 1 << 20
+FTP_WRITE_BUFFER = 8 * 1024 * 1024
+
+# Downloads up to this size stay in memory; larger ones spill to the download directory
+IN_MEMORY_DOWNLOAD_LIMIT = 10 * 1024 * 1024
+
+# Files are downloaded over up to this many FTP connections at once
+FTP_CONNECTIONS = 4
+
+# The activity log is trimmed back to LOG_KEEP_LINES once it passes LOG_MAX_LINES
+LOG_MAX_LINES = 2000
+LOG_KEEP_LINES = 1500
+
+# Last message a GUI worker puts on the status queue; re-enables the action buttons
+_WORKER_DONE = (None, "done")
+
+# Fixed middle of every api_failures.log entry: "[<timestamp>] API Failure: <message>"
+_API_FAILURE_TAG = b"] API Failure: "
+
+def _ensure_dir(path):
+    """Create a directory and its parents if missing"""
+    os.makedirs(path, exist_ok=True)
+
+@functools.lru_cache(maxsize=4096)
+def _is_valid_filename(filename):
+    """Check a name against CLINICALDATA_YYYYMMDDHHMMSS.csv (case-insensitive)"""
+    # upper() can change the length of non-ASCII names, so check it before and after
+    name = filename.upper()
+    return (len(filename) == 31 and len(name) == 31
+            and name.startswith(_FILENAME_PREFIX) and name.endswith(_FILENAME_SUFFIX)
+            and name[13:27].isdecimal())
+
+@contextlib.contextmanager
+def _open_csv_text(source):
+    """Open a path or binary stream as CSV text, leaving streams open"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'r', newline='', encoding='utf-8') as csvfile:
+            yield csvfile
+    else:
+        csvfile = io.TextIOWrapper(source, encoding='utf-8', newline='')
+        try:
+            yield csvfile
+        finally:
+            csvfile.detach()
+
+def _csv_rows(csvfile):
+    """Yield the rows csv.reader(csvfile) would, faster for plain lines"""
+    for line in csvfile:
+        if '"' in line or '\0' in line:
+            yield next(csv.reader(itertools.chain((line,), csvfile)))
+            continue
+        line = line.rstrip('\r\n')
+        yield line.split(',') if line else []
+
+def _parse_date(value):
+    """Parse a YYYY-MM-DD date, raising ValueError like strptime would"""
+    if len(value) == 10 and value[4] == value[7] == '-':
+        year, month, day = value[:4], value[5:7], value[8:]
+        if year.isdigit() and month.isdigit() and day.isdigit():
+            return datetime(int(year), int(month), int(day))
+    return datetime.strptime(value, "%Y-%m-%d")
 
 class ClinicalDataProcessor:
     """Handles FTP connection and file operations for PAGH Clinical Data"""
@@ -22,6 +115,8 @@ class ClinicalDataProcessor:
         self.remote_dir = remote_dir
         self.ftp = None
         self.connected = False
+        self._ftp_pool = collections.deque()  # idle extra connections
+        self._mlsd_supported = True  # cleared if the server rejects MLSD
     
     def connect(self, status_queue=None):
         """Connect to FTP server with passive mode"""
@@ -32,9 +127,7 @@ class ClinicalDataProcessor:
                 except:
                     pass
             
-            self.ftp = ftplib.FTP(self.ftp_host, timeout=30)
-            self.ftp.set_pasv(True)
-            self.ftp.login(self.ftp_user, self.ftp_pass)
+            self.ftp = self._open_ftp()
             
             if self.remote_dir:
                 try:
@@ -55,8 +148,60 @@ class ClinicalDataProcessor:
                 status_queue.put((f"❌ Connection failed: {e}", "error"))
             return False
     
+    def _open_ftp(self):
+        """Open a logged-in FTP connection in passive mode"""
+        ftp = ftplib.FTP(self.ftp_host, timeout=30)
+        ftp.set_pasv(True)
+        ftp.login(self.ftp_user, self.ftp_pass)
+        return ftp
+    
+    def open_extra_connections(self, count, status_queue=None):
+        """Get up to `count` more connections for parallel downloads"""
+        connections = []
+        while self._ftp_pool and len(connections) < count:
+            ftp = self._ftp_pool.pop()
+            try:
+                ftp.voidcmd('NOOP')
+                connections.append(ftp)
+            except Exception:
+                ftp.close()
+        while len(connections) < count:
+            ftp = None
+            try:
+                ftp = self._open_ftp()
+                if self.remote_dir:
+                    ftp.cwd(self.remote_dir)
+                connections.append(ftp)
+            except Exception as e:
+                if ftp is not None:
+                    # Logged in but unusable, e.g. the remote dir is missing
+                    self.close_connections([ftp])
+                if status_queue:
+                    status_queue.put((f"Warning: extra FTP connection failed: {e}", "warning"))
+                break
+        return connections
+    
+    def release_connections(self, connections):
+        """Keep connections from open_extra_connections() idle for reuse"""
+        for ftp in connections:
+            if len(self._ftp_pool) < FTP_CONNECTIONS - 1:
+                self._ftp_pool.append(ftp)
+            else:
+                self.close_connections([ftp])
+    
+    @staticmethod
+    def close_connections(connections):
+        """Quit connections opened by open_extra_connections()"""
+        for ftp in connections:
+            try:
+                ftp.quit()
+            except Exception:
+                ftp.close()
+    
     def disconnect(self):
         """Safely disconnect from FTP"""
+        self.close_connections(self._ftp_pool)
+        self._ftp_pool.clear()
         if self.ftp:
             try:
                 self.ftp.quit()
@@ -64,6 +209,16 @@ class ClinicalDataProcessor:
             except:
                 pass
     
+    def _list_files(self):
+        """Names of the files in the current remote directory"""
+        if self._mlsd_supported:
+            try:
+                return [name for name, facts in self.ftp.mlsd(facts=['type'])
+                        if facts.get('type', 'file') == 'file']
+            except ftplib.error_perm:
+                self._mlsd_supported = False
+        return self.ftp.nlst()
+    
     def get_file_list(self, status_queue=None):
         """Get list of CSV files from server"""
         if not self.ftp or not self.connected:
@@ -72,133 +227,347 @@ class ClinicalDataProcessor:
             return []
         
         try:
-            files = self.ftp.nlst()
-            csv_files = [f for f in files if f.upper().endswith('.CSV')]
+            csv_files = sorted(f for f in self._list_files() if f.upper().endswith('.CSV'))
             
             if status_queue and csv_files:
                 status_queue.put((f"Found {len(csv_files)} CSV files", "success"))
             elif status_queue:
                 status_queue.put(("No CSV files found", "warning"))
             
-            return sorted(csv_files)
+            return csv_files
         except Exception as e:
             if status_queue:
                 status_queue.put((f"Failed to retrieve file list: {e}", "error"))
             return []
 
+class _SpillingDownload:
+    """retrbinary callback that spills a download to `path` once it passes `limit` bytes"""
+    def __init__(self, path, limit):
+        self.path = path
+        self.limit = limit if path is not None else None
+        self.buffer = io.BytesIO()
+        self.file = None
+    
+    def write(self, data):
+        if self.file is not None:
+            self.file.write(data)
+        elif self.limit is not None and self.buffer.tell() + len(data) > self.limit:
+            self.file = open(self.path, 'wb', buffering=FTP_WRITE_BUFFER)
+            self.file.write(self.buffer.getbuffer())
+            self.file.write(data)
+            self.buffer = None
+        else:
+            self.buffer.write(data)
+    
+    def finish(self):
+        """Return the download: a BytesIO at its start, or the spilled path"""
+        if self.file is None:
+            self.buffer.seek(0)
+            return self.buffer
+        self.file.close()
+        return self.path
+
+class DownloadPipeline:
+    """Downloads files on background threads so transfers overlap validation"""
+    def __init__(self, connections, files, dest_dir=None, prefix="", buffer_size=3,
+                 memory_limit=None):
+        self.dest_dir = Path(dest_dir) if dest_dir is not None else None
+        self.prefix = prefix
+        self.memory_limit = memory_limit
+        self._next_index = 0
+        self._jobs = queue.Queue()
+        for job in enumerate(files):
+            self._jobs.put(job)
+        self._results = queue.Queue()
+        self._ready = {}
+        connections = list(connections)
+        self._slots = threading.Semaphore(max(buffer_size, len(connections)))
+        self._stop = threading.Event()
+        self._threads = [threading.Thread(target=self._download_worker, args=(ftp,), daemon=True)
+                         for ftp in connections]
+    
+    def __enter__(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _download_worker(self, ftp):
+        """Worker thread: download files until the job queue is empty"""
+        while True:
+            self._slots.acquire()
+            if self._stop.is_set():
+                return
+            try:
+                index, filename = self._jobs.get_nowait()
+            except queue.Empty:
+                # Pass the slot on so every other idle worker can exit too
+                self._slots.release()
+                return
+            
+            target = None if self.dest_dir is None else self.dest_dir / f"{self.prefix}{filename}"
+            try:
+                if target is not None and self.memory_limit is None:
+                    with open(target, 'wb', buffering=FTP_WRITE_BUFFER) as f:
+                        ftp.retrbinary(f'RETR {filename}', f.write, blocksize=FTP_BLOCK_SIZE)
+                else:
+                    download = _SpillingDownload(target, self.memory_limit)
+                    try:
+                        ftp.retrbinary(f'RETR {filename}', download.write, blocksize=FTP_BLOCK_SIZE)
+                    finally:
+                        target = download.finish()
+                self._results.put((index, filename, target, None))
+            except Exception as e:
+                self._results.put((index, filename, target, e))
+    
+    def next_download(self):
+        """Return (filename, target, error) for the next file in request order, once downloaded"""
+        index = self._next_index
+        while index not in self._ready:
+            result_index, *result = self._results.get()
+            self._ready[result_index] = result
+        self._next_index += 1
+        self._slots.release()
+        return tuple(self._ready.pop(index))
+    
+    def close(self):
+        """Stop the workers and delete downloads that were never handed out"""
+        self._stop.set()
+        for _ in self._threads:
+            self._slots.release()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+        
+        # Workers have exited, so whatever is queued now is final
+        while not self._results.empty():
+            index, *result = self._results.get_nowait()
+            self._ready[index] = result
+        for _, target, _ in self._ready.values():
+            if isinstance(target, Path):
+                target.unlink(missing_ok=True)
+        self._ready.clear()
+
+@dataclasses.dataclass(frozen=True)
+class ValidationError:
+    """One problem found in a CSV file"""
+    __slots__ = ('code', 'message')
+    code: str
+    message: str
+    
+    def __str__(self):
+        return self.message
+
+
+def _split_truncated(errors):
+    """Return (errors found, count suffix) for display"""
+    if errors and errors[-1].code == "TRUNCATED":
+        return errors[:-1], "+"
+    return errors, ""
+
+
 class ClinicalDataValidator:
     """Handles file validation logic for clinical data"""
+    __slots__ = ('download_dir', 'archive_dir', 'error_dir', '_archive_dir_str', '_error_dir_str',
+                 'processed_files_log', 'processed_files', '_processed_fp',
+                 '_api_log_path', '_api_log', '_api_log_lock', '_api_log_finalizer', '_closed',
+                 '__weakref__')
+    
+    # GUIDs fetched from the API in batches and shared by every validator
+    _guid_cache = collections.deque()
+    _api_healthy = True
+    _refill_lock = threading.Lock()
+    
+    # Keep-alive session shared by every validator
+    _session = requests.Session()
+    _session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+    
     def __init__(self, download_dir, archive_dir, error_dir):
         self.download_dir = Path(download_dir)
         self.archive_dir = Path(archive_dir)
         self.error_dir = Path(error_dir)
+        # Plain strings for os.path.join/os.replace when moving files
+        self._archive_dir_str = str(self.archive_dir)
+        self._error_dir_str = str(self.error_dir)
         
         # Create directories if they don't exist
         for directory in [self.download_dir, self.archive_dir, self.error_dir]:
-            directory.mkdir(parents=True, exist_ok=True)
+            _ensure_dir(directory)
         
         self.processed_files_log = self.download_dir / "processed_files.txt"
         self.processed_files = self._load_processed_files()
+        self._processed_fp = None  # append handle, opened on first save
+        
+        # Opened on first API failure, see _log_api_failure
+        self._api_log_path = os.path.join(self.error_dir, "api_failures.log")
+        self._api_log = None
+        self._api_log_lock = threading.Lock()  # the GUID refill thread logs too
+        self._api_log_finalizer = None
+        self._closed = False
     
     def _load_processed_files(self):
         """Load list of already processed files"""
-        if self.processed_files_log.exists():
-            return set(self.processed_files_log.read_text().splitlines())
-        return set()
+        try:
+            with open(self.processed_files_log, encoding='utf-8') as f:
+                return {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
     
     def _save_processed_file(self, filename):
         """Mark file as processed"""
+        if filename in self.processed_files:
+            return
         self.processed_files.add(filename)
-        self.processed_files_log.write_text("\n".join(sorted(self.processed_files)))
+        
+        # Append one line per file rather than rewriting the whole log
+        if self._processed_fp is None:
+            self._processed_fp = open(self.processed_files_log, 'a', buffering=1, encoding='utf-8')
+            if self._processed_fp.tell() > 0:
+                # Logs written by older versions have no trailing newline
+                with open(self.processed_files_log, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        self._processed_fp.write("\n")
+        self._processed_fp.write(filename + "\n")
+        # The file is already archived, so make sure a crash can't lose its entry
+        os.fsync(self._processed_fp.fileno())
     
-    def _generate_guid(self):
-            """Generate GUID using external API with fallback"""
-            api_url = "https://www.uuidtools.com/api/generate/v4"
-            max_retries = 3
-            
-            for attempt in range(max_retries):
+    def _generate_guid(self, max_retries=3):
+        """Generate GUID using external API with fallback"""
+        return self._next_guid(max_retries)[0]
+    
+    def _next_guid(self, max_retries=3):
+        """Return (guid, source), with source either "API" or "Local Fallback" for logging"""
+        try:
+            guid = self._guid_cache.popleft()
+        except IndexError:
+            guid = None
+            if ClinicalDataValidator._api_healthy and self._fetch_guid_batch(max_retries):
                 try:
-                    response = requests.get(api_url, timeout=5)
-                    if response.status_code == 200:
-                        guids = response.json()
-                        if guids and isinstance(guids, list) and len(guids) > 0:
-                            return guids[0]  # Return the first GUID
-                    
-                    # If we got here but no valid response, raise an exception
-                    raise Exception(f"Invalid API response: {response.status_code}")
-                    
-                except requests.exceptions.Timeout:
-                    if attempt < max_retries - 1:
-                        time.sleep(1)  # Wait before retry
-                        continue
-                    else:
-                        self._log_api_failure("Timeout")
-                        break
-                except requests.exceptions.ConnectionError:
-                    if attempt < max_retries - 1:
-                        time.sleep(1)
-                        continue
-                    else:
-                        self._log_api_failure("Connection Error")
-                        break
-                except Exception as e:
-                    if attempt < max_retries - 1:
-                        time.sleep(1)
-                        continue
-                    else:
-                        self._log_api_failure(str(e))
-                        break
-            
-            # Fallback to local UUID generation
-            fallback_guid = str(uuid.uuid4())
-            self._log_api_failure(f"Using fallback GUID: {fallback_guid}")
-            return fallback_guid
+                    guid = self._guid_cache.popleft()
+                except IndexError:
+                    pass  # drained by another thread in the meantime
+        
+        if guid is not None:
+            if len(self._guid_cache) < GUID_REFILL_THRESHOLD:
+                self._refill_guid_cache_async()
+            return guid, "API"
+        
+        # Fallback to local UUID generation
+        fallback_guid = f"{_uuid_base}{next(_uuid_ctr):012x}"
+        self._log_api_failure(f"Using fallback GUID: {fallback_guid}")
+        return fallback_guid, "Local Fallback"
+    
+    def _fetch_guid_batch(self, max_retries=3):
+        """Fetch one batch of GUIDs into the shared cache; False if the API failed"""
+        api_url = f"{UUID_API_URL}/count/{GUID_BATCH_SIZE}"
+        
+        for attempt in range(max_retries):
+            try:
+                response = self._session.get(api_url, timeout=5)
+                if response.status_code == 200:
+                    guids = response.json()
+                    if guids and isinstance(guids, list) and len(guids) > 0:
+                        self._guid_cache.extend(guids)
+                        return True
+                
+                # If we got here but no valid response, raise an exception
+                raise Exception(f"Invalid API response: {response.status_code}")
+                
+            except requests.exceptions.Timeout:
+                if attempt < max_retries - 1:
+                    time.sleep(1)  # Wait before retry
+                    continue
+                else:
+                    self._log_api_failure("Timeout")
+                    break
+            except requests.exceptions.ConnectionError:
+                if attempt < max_retries - 1:
+                    time.sleep(1)
+                    continue
+                else:
+                    self._log_api_failure("Connection Error")
+                    break
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    time.sleep(1)
+                    continue
+                else:
+                    self._log_api_failure(str(e))
+                    break
+        
+        ClinicalDataValidator._api_healthy = False
+        return False
+    
+    def _refill_guid_cache_async(self):
+        """Top up the shared GUID cache on a background thread"""
+        if not ClinicalDataValidator._api_healthy or not self._refill_lock.acquire(blocking=False):
+            return  # API is down, or a refill is already running
+        
+        def refill():
+            try:
+                self._fetch_guid_batch()
+            finally:
+                self._refill_lock.release()
+        
+        threading.Thread(target=refill, daemon=True).start()
     
     def _log_api_failure(self, error_message):
         """Log API failures for monitoring"""
-        api_log_path = self.error_dir / "api_failures.log"
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry = b"".join((b"[", timestamp.encode("ascii"), _API_FAILURE_TAG,
+                          error_message.encode("utf-8"), b"\n"))
+        with self._api_log_lock:
+            if self._api_log is None:
+                if self._closed:
+                    # A background refill can fail after close(); log it without reopening the file
+                    with open(self._api_log_path, 'ab') as f:
+                        f.write(entry)
+                    return
+                # Kept open and unbuffered so each entry is a single write
+                self._api_log = open(self._api_log_path, 'ab', buffering=0)
+                self._api_log_finalizer = weakref.finalize(self, self._api_log.close)
+            self._api_log.write(entry)
+    
+    def close(self):
+        """Release log file handles held by the validator"""
+        self._closed = True
+        if self._processed_fp is not None:
+            self._processed_fp.close()
+            self._processed_fp = None
+        with self._api_log_lock:
+            if self._api_log_finalizer is not None:
+                self._api_log_finalizer()
+                self._api_log_finalizer = None
+                self._api_log = None
+    
+    def _log_error(self, filename, error_details, status_queue=None):
+        """Log error with API-generated GUID and timestamp"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Generate GUID via API
+        if status_queue:
+            status_queue.put(("  → Generating GUID via API...", "info"))
+        
+        guid, guid_source = self._next_guid()
         
-        log_entry = f"[{timestamp}] API Failure: {error_message}\n"
-        with open(api_log_path, "a") as f:
+        # Create structured log entry
+        log_entry = f"[{timestamp}] GUID: {guid} | Source: {guid_source} | File: {filename} | Error: {error_details}\n"
+        
+        error_log_path = self.error_dir / "error_report.log"
+        with open(error_log_path, "a") as f:
             f.write(log_entry)
         
-    
-        def _log_error(self, filename, error_details, status_queue=None):
-            """Log error with API-generated GUID and timestamp"""
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Generate GUID via API
-            if status_queue:
-                status_queue.put(("  → Generating GUID via API...", "info"))
-            
-            guid = self._generate_guid()
-            
-            # Check if it's a fallback GUID
-            is_fallback = not guid.startswith("API:")
-            if is_fallback:
-                guid_source = "Local Fallback"
-            else:
-                guid_source = "API"
-                # Remove the "API:" prefix for cleaner display
-                guid = guid[4:]
-            
-            # Create structured log entry
-            log_entry = f"[{timestamp}] GUID: {guid} | Source: {guid_source} | File: {filename} | Error: {error_details}\n"
-            
-            error_log_path = self.error_dir / "error_report.log"
-            with open(error_log_path, "a") as f:
-                f.write(log_entry)
-            
-            if status_queue:
-                status_queue.put((f"  📝 Error logged with {guid_source} GUID: {guid}", "warning"))
-            
-            return guid, log_entry
+        if status_queue:
+            status_queue.put((f"  📝 Error logged with {guid_source} GUID: {guid}", "warning"))
         
+        return guid, log_entry
+    
     def _validate_filename_pattern(self, filename, status_queue=None):
         """Validate filename against CLINICALDATA_YYYYMMDDHHMMSS.csv pattern"""
-        pattern = r'^CLINICALDATA_\d{14}\.CSV$'
-        is_valid = re.match(pattern, filename, re.IGNORECASE) is not None
+        is_valid = _is_valid_filename(filename)
         
         if status_queue:
             if is_valid:
@@ -207,32 +576,30 @@ class ClinicalDataValidator:
                 status_queue.put((f"  ✗ Invalid filename pattern (expected CLINICALDATA_YYYYMMDDHHMMSS.csv)", "error"))
         return is_valid
     
-    def _validate_csv_content(self, file_path, status_queue=None):
+    def _validate_csv_content(self, file_path, status_queue=None, max_errors=100):
         """Validate CSV content structure and data integrity"""
         errors = []
-        valid_records = []
+        valid_count = 0  # only the count is reported, so valid rows are not kept
         seen_records = set()
         
         if status_queue:
             status_queue.put((f"  → Validating content...", "info"))
         
         try:
-            with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
+            with _open_csv_text(file_path) as csvfile:
+                reader = _csv_rows(csvfile)
                 
                 try:
                     header = next(reader)
-                    expected_fields = ["PatientID", "TrialCode", "DrugCode", "Dosage_mg", 
-                                     "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"]
-                    if header != expected_fields:
-                        errors.append(f"Invalid header. Expected {len(expected_fields)} fields: {expected_fields}")
+                    if header != _EXPECTED_FIELDS:
+                        errors.append(ValidationError("HEADER_MISMATCH", f"Invalid header. Expected {len(_EXPECTED_FIELDS)} fields: {_EXPECTED_FIELDS}"))
                         if status_queue:
                             status_queue.put((f"  ✗ Header mismatch", "error"))
                         return False, errors, 0
                     elif status_queue:
                         status_queue.put((f"  ✓ Header valid ({len(header)} fields)", "success"))
                 except StopIteration:
-                    errors.append("File is empty")
+                    errors.append(ValidationError("EMPTY_FILE", "File is empty"))
                     if status_queue:
                         status_queue.put((f"  ✗ File is empty", "error"))
                     return False, errors, 0
@@ -243,15 +610,19 @@ class ClinicalDataValidator:
                     'date_range': 0, 'date_format': 0, 'outcome': 0,
                     'duplicate': 0
                 }
+                truncated = False
                 
                 for row in reader:
+                    if len(errors) >= max_errors:
+                        truncated = True
+                        break
                     row_num += 1
                     record_errors = []
                     
                     # Check field count
                     if len(row) != 9:
                         error_counts['field_count'] += 1
-                        errors.append(f"Row {row_num}: Expected 9 fields, got {len(row)}")
+                        errors.append(ValidationError("FIELD_COUNT", f"Row {row_num}: Expected 9 fields, got {len(row)}"))
                         continue
                     
                     # Unpack fields
@@ -259,8 +630,7 @@ class ClinicalDataValidator:
                      start_date, end_date, outcome, side_effects, analyst) = row
                     
                     # Check for missing required fields
-                    if not all([patient_id, trial_code, drug_code, dosage, 
-                               start_date, end_date, outcome, side_effects, analyst]):
+                    if not all(row):
                         error_counts['missing_fields'] += 1
                         record_errors.append("Missing required fields")
                     
@@ -276,8 +646,8 @@ class ClinicalDataValidator:
                     
                     # Validate date range and format
                     try:
-                        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-                        end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+                        start_dt = _parse_date(start_date)
+                        end_dt = _parse_date(end_date)
                         if end_dt < start_dt:
                             error_counts['date_range'] += 1
                             record_errors.append(f"EndDate ({end_date}) before StartDate ({start_date})")
@@ -286,13 +656,12 @@ class ClinicalDataValidator:
                         record_errors.append(f"Invalid date format (expected YYYY-MM-DD)")
                     
                     # Validate outcome values
-                    valid_outcomes = ["Improved", "No Change", "Worsened"]
-                    if outcome not in valid_outcomes:
+                    if outcome not in _VALID_OUTCOMES:
                         error_counts['outcome'] += 1
-                        record_errors.append(f"Invalid outcome '{outcome}'. Must be one of: {', '.join(valid_outcomes)}")
+                        record_errors.append(f"Invalid outcome '{outcome}'. Must be one of: {_OUTCOME_CHOICES}")
                     
                     # Check for duplicate records
-                    record_key = f"{patient_id}_{trial_code}_{drug_code}_{start_date}"
+                    record_key = (patient_id, trial_code, drug_code, start_date)
                     if record_key in seen_records:
                         error_counts['duplicate'] += 1
                         record_errors.append(f"Duplicate record")
@@ -300,14 +669,20 @@ class ClinicalDataValidator:
                         seen_records.add(record_key)
                     
                     if record_errors:
-                        errors.append(f"Row {row_num}: {'; '.join(record_errors)}")
+                        errors.append(ValidationError("INVALID_RECORD", f"Row {row_num}: {'; '.join(record_errors)}"))
                     else:
-                        valid_records.append(row)
+                        valid_count += 1
+                
+                if truncated:
+                    errors.append(ValidationError(
+                        "TRUNCATED", f"Validation stopped after {max_errors} errors; remaining rows not checked"))
                 
                 # Summary reporting
                 if status_queue:
                     status_queue.put((f"  → Scanned {row_num - 1} rows", "info"))
-                    status_queue.put((f"  → Valid records: {len(valid_records)}", "success"))
+                    if truncated:
+                        status_queue.put((f"  ✗ Stopped after {max_errors} errors", "warning"))
+                    status_queue.put((f"  → Valid records: {valid_count}", "success"))
                     
                     if error_counts['field_count'] > 0:
                         status_queue.put((f"    • Field count errors: {error_counts['field_count']}", "error"))
@@ -325,138 +700,205 @@ class ClinicalDataValidator:
                         status_queue.put((f"    • Duplicates: {error_counts['duplicate']}", "error"))
             
             if errors:
-                return False, errors, len(valid_records)
-            return True, [], len(valid_records)
+                return False, errors, valid_count
+            return True, [], valid_count
             
         except UnicodeDecodeError:
-            return False, ["File is not valid UTF-8 encoded CSV"], 0
+            return False, [ValidationError("ENCODING", "File is not valid UTF-8 encoded CSV")], 0
         except Exception as e:
-            return False, [f"File read error: {str(e)}"], 0
+            return False, [ValidationError("READ_ERROR", f"File read error: {str(e)}")], 0
     
-    def validate_selected_files(self, ftp, files, status_queue):
+    def validate_selected_files(self, ftp, files, status_queue, extra_connections=(), cancel=None):
         """Validate specific files without archiving (dry-run)"""
         valid_count = 0
         invalid_count = 0
         
-        for filename in files:
-            if filename in self.processed_files:
-                status_queue.put((f"\n⏭️ Skipping: {filename} (already processed)", "warning"))
-                continue
-            
-            status_queue.put((f"\n{'='*60}", "info"))
-            status_queue.put((f"🔍 Validating: {filename}", "info"))
-            
-            temp_path = self.download_dir / f"temp_validate_{filename}"
-            try:
-                # Download file temporarily for validation
-                with open(temp_path, 'wb') as f:
-                    ftp.retrbinary(f'RETR {filename}', f.write)
+        files = list(dict.fromkeys(files))  # one download per distinct file
+        pending = [f for f in files if f not in self.processed_files]
+        with DownloadPipeline([ftp, *extra_connections], pending, self.download_dir,
+                              prefix="temp_validate_",
+                              memory_limit=IN_MEMORY_DOWNLOAD_LIMIT) as downloads:
+            for filename in files:
+                if cancel is not None and cancel.is_set():
+                    status_queue.put(("\n⏹️ Stopped before the remaining files", "warning"))
+                    break
+                if filename in self.processed_files:
+                    status_queue.put((f"\n⏭️ Skipping: {filename} (already processed)", "warning"))
+                    continue
+                
+                status_queue.put((f"\n{'='*60}", "info"))
+                status_queue.put((f"🔍 Validating: {filename}", "info"))
                 
-                # Validate filename pattern
-                if self._validate_filename_pattern(filename, status_queue):
-                    is_valid, errors, record_count = self._validate_csv_content(temp_path, status_queue)
+                # Wait for the download of this file
+                _, content, download_error = downloads.next_download()
+                try:
+                    if download_error:
+                        raise download_error
                     
-                    if is_valid:
-                        status_queue.put((f"✅ VALID: {filename} ({record_count} records)", "success"))
-                        valid_count += 1
+                    # Validate filename pattern
+                    if self._validate_filename_pattern(filename, status_queue):
+                        is_valid, errors, record_count = self._validate_csv_content(content, status_queue)
+                        
+                        if is_valid:
+                            status_queue.put((f"✅ VALID: {filename} ({record_count} records)", "success"))
+                            valid_count += 1
+                        else:
+                            found, more = _split_truncated(errors)
+                            status_queue.put((f"❌ INVALID: {filename} ({len(found)}{more} errors)", "error"))
+                            invalid_count += 1
                     else:
-                        status_queue.put((f"❌ INVALID: {filename} ({len(errors)} errors)", "error"))
+                        status_queue.put((f"❌ INVALID: {filename} (filename pattern)", "error"))
                         invalid_count += 1
-                else:
-                    status_queue.put((f"❌ INVALID: {filename} (filename pattern)", "error"))
+                except Exception as e:
+                    status_queue.put((f"❌ Error validating {filename}: {e}", "error"))
                     invalid_count += 1
-                
-                # Clean up temporary file
-                temp_path.unlink()
-            except Exception as e:
-                status_queue.put((f"❌ Error validating {filename}: {e}", "error"))
-                invalid_count += 1
-                if temp_path.exists():
-                    temp_path.unlink()
+                finally:
+                    if isinstance(content, Path):
+                        content.unlink(missing_ok=True)
         
         status_queue.put(("\n" + "="*60, "info"))
         status_queue.put(("✅ Validation complete!", "complete"))
         status_queue.put((f"📊 Results: {valid_count} valid, {invalid_count} invalid", "summary"))
     
-    def process_selected_files(self, ftp, files, status_queue):
+    @staticmethod
+    def _store_download(content, dest):
+        """Move a finished download to `dest`"""
+        if isinstance(content, Path):
+            os.replace(content, dest)
+            return
+        part = dest + ".part"
+        try:
+            with open(part, 'wb') as f:
+                f.write(content.getbuffer())
+            os.replace(part, dest)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(part)
+            raise
+    
+    def process_selected_files(self, ftp, files, status_queue, extra_connections=(), cancel=None):
         """Process files: download, validate, archive or reject"""
         processed_count = 0
         error_count = 0
         
-        for filename in files:
-            if filename in self.processed_files:
-                status_queue.put((f"\n⏭️ Skipping: {filename} (already processed)", "warning"))
-                continue
-            
-            status_queue.put((f"\n{'='*60}", "info"))
-            status_queue.put((f"🔄 Processing: {filename}", "info"))
-            
-            local_path = self.download_dir / filename
-            try:
-                # Download file
-                with open(local_path, 'wb') as f:
-                    ftp.retrbinary(f'RETR {filename}', f.write)
-                status_queue.put((f"  📥 Downloaded successfully", "success"))
-                
-                # Validate filename pattern
-                if not self._validate_filename_pattern(filename, status_queue):
-                    error_file = self.error_dir / filename
-                    local_path.rename(error_file)
-                    guid, _ = self._log_error(filename, "Invalid filename pattern")
-                    status_queue.put((f"  ❌ Rejected - Invalid filename pattern (GUID: {guid})", "error"))
-                    error_count += 1
+        files = list(dict.fromkeys(files))  # one download per distinct file
+        pending = [f for f in files if f not in self.processed_files]
+        with DownloadPipeline([ftp, *extra_connections], pending, self.download_dir,
+                              memory_limit=IN_MEMORY_DOWNLOAD_LIMIT) as downloads:
+            for filename in files:
+                if cancel is not None and cancel.is_set():
+                    status_queue.put(("\n⏹️ Stopped before the remaining files", "warning"))
+                    break
+                if filename in self.processed_files:
+                    status_queue.put((f"\n⏭️ Skipping: {filename} (already processed)", "warning"))
                     continue
                 
-                # Validate content
-                is_valid, errors, record_count = self._validate_csv_content(local_path, status_queue)
+                status_queue.put((f"\n{'='*60}", "info"))
+                status_queue.put((f"🔄 Processing: {filename}", "info"))
                 
-                if is_valid:
-                    # Archive valid file with current date suffix
-                    try:
-                        current_date = datetime.now().strftime("%Y%m%d")
-                        base_name = filename.replace('.CSV', '').replace('.csv', '')
-                        archive_filename = f"{base_name}_{current_date}.CSV"
-                        archive_path = self.archive_dir / archive_filename
-                        
-                        local_path.rename(archive_path)
-                        self._save_processed_file(filename)
-                        
-                        status_queue.put((f"  ✅ Archived as: {archive_filename} ({record_count} records)", "success"))
-                        processed_count += 1
-                    except Exception as e:
-                        guid, _ = self._log_error(filename, f"Archival failed: {e}")
-                        status_queue.put((f"  ❌ Archival error (GUID: {guid})", "error"))
-                        error_count += 1
-                        if local_path.exists():
-                            local_path.unlink()
-                else:
-                    # Move invalid file to error directory
-                    error_file = self.error_dir / filename
-                    local_path.rename(error_file)
+                # Wait for the download of this file
+                _, content, download_error = downloads.next_download()
+                try:
+                    if download_error:
+                        raise download_error
+                    status_queue.put((f"  📥 Downloaded successfully", "success"))
                     
-                    # Create error summary
-                    error_summary = " | ".join(errors[:3])
-                    if len(errors) > 3:
-                        error_summary += f" ... and {len(errors) - 3} more"
+                    # Validate filename pattern
+                    if not self._validate_filename_pattern(filename, status_queue):
+                        self._store_download(content, os.path.join(self._error_dir_str, filename))
+                        guid, _ = self._log_error(filename, "Invalid filename pattern")
+                        status_queue.put((f"  ❌ Rejected - Invalid filename pattern (GUID: {guid})", "error"))
+                        error_count += 1
+                        continue
                     
-                    guid, _ = self._log_error(filename, error_summary)
-                    status_queue.put((f"  ❌ Rejected ({len(errors)} errors)", "error"))
-                    for error in errors[:3]:
-                        status_queue.put((f"    • {error}", "error"))
-                    if len(errors) > 3:
-                        status_queue.put((f"    • ... and {len(errors) - 3} more errors", "error"))
+                    # Validate content
+                    is_valid, errors, record_count = self._validate_csv_content(content, status_queue)
                     
+                    if is_valid:
+                        # Archive valid file with current date suffix
+                        try:
+                            current_date = datetime.now().strftime("%Y%m%d")
+                            base_name = filename.replace('.CSV', '').replace('.csv', '')
+                            archive_filename = f"{base_name}_{current_date}.CSV"
+                            
+                            self._store_download(content, os.path.join(self._archive_dir_str, archive_filename))
+                            self._save_processed_file(filename)
+                            
+                            status_queue.put((f"  ✅ Archived as: {archive_filename} ({record_count} records)", "success"))
+                            processed_count += 1
+                        except Exception as e:
+                            guid, _ = self._log_error(filename, f"Archival failed: {e}")
+                            status_queue.put((f"  ❌ Archival error (GUID: {guid})", "error"))
+                            error_count += 1
+                            if isinstance(content, Path):
+                                content.unlink(missing_ok=True)
+                    else:
+                        # Move invalid file to error directory
+                        self._store_download(content, os.path.join(self._error_dir_str, filename))
+                        
+                        # Create error summary
+                        found, more = _split_truncated(errors)
+                        error_summary = " | ".join(map(str, found[:3]))
+                        if len(found) > 3:
+                            error_summary += f" ... and {len(found) - 3}{more} more"
+                        
+                        guid, _ = self._log_error(filename, error_summary)
+                        status_queue.put((f"  ❌ Rejected ({len(found)}{more} errors)", "error"))
+                        for error in found[:3]:
+                            status_queue.put((f"    • {error}", "error"))
+                        if len(found) > 3:
+                            status_queue.put((f"    • ... and {len(found) - 3}{more} more errors", "error"))
+                        
+                        error_count += 1
+                except Exception as e:
+                    status_queue.put((f"  ❌ Fatal error: {e}", "error"))
                     error_count += 1
-            except Exception as e:
-                status_queue.put((f"  ❌ Fatal error: {e}", "error"))
-                error_count += 1
-                if local_path.exists():
-                    local_path.unlink()
+                    if isinstance(content, Path):
+                        content.unlink(missing_ok=True)
         
         status_queue.put(("\n" + "="*60, "info"))
         status_queue.put(("✅ Processing complete!", "complete"))
         status_queue.put((f"📊 Summary: {processed_count} archived, {error_count} rejected", "summary"))
 
+class TkStatusQueue:
+    """Status queue that wakes the Tk main loop when a message arrives"""
+    def __init__(self, root, on_message):
+        self._items = collections.deque()
+        self._root = root
+        self._on_message = on_message
+        self._wake_pending = False
+        self._closed = False
+    
+    def put(self, item):
+        if self._closed:
+            return  # the window is gone; workers still finishing a file have no one to tell
+        self._items.append(item)
+        if not self._wake_pending:
+            self._wake_pending = True
+            try:
+                self._root.after_idle(self._on_message)
+            except (RuntimeError, tk.TclError):
+                pass  # the main loop exited between the check above and this call
+    
+    def close(self):
+        """Drop every later put, for use once the main loop is shutting down"""
+        self._closed = True
+    
+    def drain(self):
+        """Remove and return every queued item"""
+        self._wake_pending = False
+        items = []
+        popleft = self._items.popleft
+        try:
+            while True:
+                items.append(popleft())
+        except IndexError:
+            pass
+        return items
+    
+    def qsize(self):
+        return len(self._items)
+
 class PAGHClinicalDataManager:
     """Main GUI application for PAGH Clinical Data Management"""
     def __init__(self, root):
@@ -466,10 +908,21 @@ class PAGHClinicalDataManager:
         
         self.processor = None
         self.validator = None
+        self._validator_key = None  # directories self.validator was built for
+        self.validate_btn = None  # set by create_widgets
+        self.process_btn = None
+        
+        # Long-lived worker threads for connect/refresh/validate/process
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=2,
+                                                               thread_name_prefix='helix-io')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.is_processing = False
         
         self.all_files = []
-        self.displayed_files = []
+        self.all_files_folded = []  # case-folded all_files, for the search filter
+        self.visible_idx = []  # all_files index of each listbox row
+        self._filter_term = ""  # search term visible_idx was built for
+        self._filter_job = None  # pending debounced filter_file_list call
         
         # Default configuration
         self.ftp_host = tk.StringVar(value="localhost")
@@ -482,6 +935,8 @@ class PAGHClinicalDataManager:
         self.download_dir = tk.StringVar(value=str(default_base / "Downloads"))
         self.archive_dir = tk.StringVar(value=str(default_base / "Archive"))
         self.error_dir = tk.StringVar(value=str(default_base / "Errors"))
+        for var in (self.download_dir, self.archive_dir, self.error_dir):
+            var.trace_add('write', self._invalidate_validator)
         
         self.search_var = tk.StringVar()
         
@@ -491,7 +946,7 @@ class PAGHClinicalDataManager:
     def setup_directories(self):
         """Create necessary directories"""
         for var in [self.download_dir, self.archive_dir, self.error_dir]:
-            Path(var.get()).mkdir(parents=True, exist_ok=True)
+            _ensure_dir(var.get())
     
     def create_widgets(self):
         """Create the main GUI layout with 3-column design"""
@@ -552,7 +1007,7 @@ class PAGHClinicalDataManager:
         ttk.Label(control_frame, text="Search:").pack(side=tk.LEFT)
         self.search_entry = ttk.Entry(control_frame, textvariable=self.search_var, width=20)
         self.search_entry.pack(side=tk.LEFT, padx=(5, 5))
-        self.search_entry.bind('<KeyRelease>', self.filter_file_list)
+        self.search_entry.bind('<KeyRelease>', self.schedule_filter)
         
         ttk.Button(control_frame, text="🔍", command=self.filter_file_list, width=3).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(control_frame, text="🔄", command=self.refresh_file_list, width=3).pack(side=tk.LEFT)
@@ -561,7 +1016,7 @@ class PAGHClinicalDataManager:
         list_container = ttk.Frame(server_frame)
         list_container.pack(fill=tk.BOTH, expand=True)
         
-        self.file_listbox = tk.Listbox(list_container, height=15, selectmode=tk.SINGLE)
+        self.file_listbox = tk.Listbox(list_container, height=15, selectmode=tk.EXTENDED)
         self.file_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         scrollbar = ttk.Scrollbar(list_container, command=self.file_listbox.yview)
@@ -629,42 +1084,64 @@ class PAGHClinicalDataManager:
         self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
         self.progress.pack(fill=tk.X, pady=(10, 0))
         
-        # Queue for thread-safe GUI updates
-        self.status_queue = queue.Queue()
-        self.root.after(100, self.check_queue)
+        # Queue for thread-safe GUI updates, drained whenever workers post to it
+        self.status_queue = TkStatusQueue(self.root, self.check_queue)
+        self._closing = threading.Event()  # set by on_close; workers stop before their next file
+        self._watchdog_job = None
     
     def browse_directory(self, var):
         """Browse for directory"""
         path = filedialog.askdirectory()
         if path:
             var.set(path)
-            self.setup_directories()
+            _ensure_dir(path)
     
     def log_message(self, message, tag="info"):
         """Add timestamped message to log"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.log_text.insert(tk.END, f"[{timestamp}] {message}\n", tag)
+        self._trim_log()
         self.log_text.see(tk.END)
-        self.root.update()
+    
+    def _trim_log(self):
+        """Drop the oldest lines once the log grows past LOG_MAX_LINES"""
+        lines = int(self.log_text.index('end-1c').split('.')[0])
+        if lines > LOG_MAX_LINES:
+            self.log_text.delete('1.0', f'{lines - LOG_KEEP_LINES}.0')
     
     def check_queue(self):
         """Check for messages from worker threads"""
-        try:
-            while True:
-                message, tag = self.status_queue.get_nowait()
-                self.log_message(message, tag)
-                
-                if tag in ["complete", "error"]:
-                    self.is_processing = False
-                    self.progress.stop()
-                    if hasattr(self, 'validate_btn'):
-                        self.validate_btn.config(state=tk.NORMAL, text="🔍 Validate Selected")
-                    if hasattr(self, 'process_btn'):
-                        self.process_btn.config(state=tk.NORMAL, text="🚀 Process Selected")
-        except queue.Empty:
-            pass
-        
-        self.root.after(100, self.check_queue)
+        messages = self.status_queue.drain()
+        finished = _WORKER_DONE in messages
+        if finished:
+            messages = [item for item in messages if item != _WORKER_DONE]
+        
+        if messages:
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            chunks = []
+            for tag, run in itertools.groupby(messages, key=lambda item: item[1]):
+                chunks.append("".join(f"[{timestamp}] {message}\n" for message, _ in run))
+                chunks.append(tag)
+            self.log_text.insert(tk.END, *chunks)
+            self._trim_log()
+            self.log_text.see(tk.END)
+        
+        if finished:
+            self.is_processing = False
+            self.progress.stop()
+            if self.validate_btn is not None:
+                self.validate_btn.config(state=tk.NORMAL, text="🔍 Validate Selected")
+            if self.process_btn is not None:
+                self.process_btn.config(state=tk.NORMAL, text="🚀 Process Selected")
+        
+        # Safety net while a worker runs, in case a wake-up is ever missed
+        if self.is_processing and self._watchdog_job is None:
+            self._watchdog_job = self.root.after(500, self._queue_watchdog)
+    
+    def _queue_watchdog(self):
+        """Drain the status queue periodically while processing"""
+        self._watchdog_job = None
+        self.check_queue()
     
     def update_status_label(self):
         """Update connection status label"""
@@ -702,13 +1179,13 @@ class PAGHClinicalDataManager:
         self.is_processing = True
         self.progress.start()
         
-        thread = threading.Thread(target=self._connect_and_load_files)
-        thread.daemon = True
-        thread.start()
+        self._executor.submit(self._connect_and_load_files)
     
     def _connect_and_load_files(self):
         """Worker thread for FTP connection"""
         try:
+            if self.processor:
+                self.processor.disconnect()
             self.processor = ClinicalDataProcessor(
                 self.ftp_host.get(),
                 self.ftp_user.get(),
@@ -717,16 +1194,17 @@ class PAGHClinicalDataManager:
             )
             
             if self.processor.connect(self.status_queue):
-                self.all_files = self.processor.get_file_list(self.status_queue)
-                self.root.after(0, self.update_file_listbox)
+                self._get_validator()
+                files = self.processor.get_file_list(self.status_queue)
+                self.root.after(0, self.update_file_listbox, files)
                 self.root.after(0, self.update_status_label)
             else:
                 self.status_queue.put(("❌ Failed to establish connection", "error"))
             
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
         except Exception as e:
             self.status_queue.put((f"🚨 Connection error: {e}", "error"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
     
     def disconnect_from_server(self):
         """Disconnect from FTP server"""
@@ -741,47 +1219,65 @@ class PAGHClinicalDataManager:
         self.is_processing = True
         self.progress.start()
         
-        thread = threading.Thread(target=self._disconnect_worker)
-        thread.daemon = True
-        thread.start()
+        self._executor.submit(self._disconnect_worker)
     
     def _disconnect_worker(self):
         """Worker thread for disconnection"""
         try:
             if self.processor:
                 self.processor.disconnect()
-                self.all_files = []
-                self.root.after(0, self.update_file_listbox)
+                self.root.after(0, self.update_file_listbox, [])
                 self.root.after(0, self.update_status_label)
                 self.status_queue.put(("✅ Disconnected from FTP server", "success"))
             
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
         except Exception as e:
             self.status_queue.put((f"🚨 Disconnect failed: {e}", "error"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
     
-    def update_file_listbox(self):
-        """Update the file listbox with current files"""
+    def update_file_listbox(self, files):
+        """Show a new server listing, replacing all_files and the filter state built from it"""
+        # Assigned on the main thread so a pending filter never sees a half-swapped list
+        self.all_files = files
         self.file_listbox.delete(0, tk.END)
-        self.displayed_files = self.all_files.copy()
-        for file in self.displayed_files:
-            self.file_listbox.insert(tk.END, file)
-        self.log_message(f"📁 Loaded {len(self.displayed_files)} files from server", "info")
+        self.all_files_folded = [f.casefold() for f in self.all_files]
+        self.visible_idx = range(len(self.all_files))
+        self._filter_term = ""
+        if self.all_files:
+            self.file_listbox.insert(tk.END, *self.all_files)
+        self.log_message(f"📁 Loaded {len(self.all_files)} files from server", "info")
+    
+    def schedule_filter(self, event=None):
+        """Filter 150 ms after the last keystroke rather than on every key"""
+        if self._filter_job is not None:
+            self.root.after_cancel(self._filter_job)
+        self._filter_job = self.root.after(150, self.filter_file_list)
     
     def filter_file_list(self, event=None):
         """Filter files based on search term"""
-        search_term = self.search_var.get().lower()
+        if self._filter_job is not None:
+            # Run directly (🔍 or Enter) while a debounced run is still pending
+            self.root.after_cancel(self._filter_job)
+            self._filter_job = None
+        search_term = self.search_var.get().casefold()
         self.file_listbox.delete(0, tk.END)
-        self.displayed_files = [f for f in self.all_files if search_term in f.lower()]
-        
-        for file in self.displayed_files:
-            self.file_listbox.insert(tk.END, file)
+        # Every match for a longer term also matched the term it contains, so
+        # typing further only rescans the rows already visible
+        if self._filter_term in search_term:
+            candidates = self.visible_idx
+        else:
+            candidates = range(len(self.all_files))
+        folded = self.all_files_folded
+        self.visible_idx = [i for i in candidates if search_term in folded[i]]
+        self._filter_term = search_term
+        if self.visible_idx:
+            self.file_listbox.insert(tk.END, *[self.all_files[i] for i in self.visible_idx])
         
         # Show message if no results
-        if search_term and not self.displayed_files:
+        if search_term and not self.visible_idx:
             self.log_message(f"❌ No files found matching '{search_term}'", "error")
-        elif search_term and self.displayed_files:
-            self.log_message(f"🔍 Filtered: showing {len(self.displayed_files)} files matching '{search_term}'", "info")
+        elif search_term and self.visible_idx:
+            self.log_message(f"🔍 Filtered: showing {len(self.visible_idx)} files matching '{search_term}'", "info")
     
     def refresh_file_list(self):
         """Refresh file list from server"""
@@ -799,9 +1295,7 @@ class PAGHClinicalDataManager:
         self.is_processing = True
         self.progress.start()
         
-        thread = threading.Thread(target=self._refresh_files)
-        thread.daemon = True
-        thread.start()
+        self._executor.submit(self._refresh_files)
     
     def _refresh_files(self):
         """Worker thread for refreshing files"""
@@ -809,16 +1303,30 @@ class PAGHClinicalDataManager:
             if not self.processor.connected:
                 self.processor.connect(self.status_queue)
             
-            self.all_files = self.processor.get_file_list(self.status_queue)
-            self.root.after(0, self.update_file_listbox)
+            files = self.processor.get_file_list(self.status_queue)
+            self.root.after(0, self.update_file_listbox, files)
             self.status_queue.put(("✅ File list refreshed", "success"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
         except Exception as e:
             self.status_queue.put((f"🚨 Refresh failed: {e}", "error"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
+    
+    def _invalidate_validator(self, *args):
+        """Directory setting edited: build a new validator on next use"""
+        self._validator_key = None
+    
+    def _get_validator(self):
+        """Return the validator for the current directories"""
+        if self._validator_key is None:
+            key = (self.download_dir.get(), self.archive_dir.get(), self.error_dir.get())
+            if self.validator:
+                self.validator.close()
+            self.validator = ClinicalDataValidator(*key)
+            self._validator_key = key
+        return self.validator
     
     def validate_selected(self):
-        """Validate selected file (dry-run)"""
+        """Validate selected files (dry-run)"""
         if self.is_processing:
             return
         
@@ -827,7 +1335,7 @@ class PAGHClinicalDataManager:
             messagebox.showwarning("No Selection", "Please select a file to validate.")
             return
         
-        selected_file = self.displayed_files[selection[0]]
+        selected_files = [self.all_files[self.visible_idx[i]] for i in selection]
         
         self.log_text.delete(1.0, tk.END)
         self.is_processing = True
@@ -835,30 +1343,34 @@ class PAGHClinicalDataManager:
         self.process_btn.config(state=tk.DISABLED)
         self.progress.start()
         
-        self.validator = ClinicalDataValidator(
-            self.download_dir.get(),
-            self.archive_dir.get(),
-            self.error_dir.get()
-        )
+        self._get_validator()
         
-        thread = threading.Thread(target=self._validate_selected_worker, args=([selected_file],))
-        thread.daemon = True
-        thread.start()
+        self._executor.submit(self._validate_selected_worker, selected_files)
+    
+    def _run_over_connections(self, run, files):
+        """Call a validator run with extra FTP connections for the files still to download"""
+        pending = [f for f in dict.fromkeys(files) if f not in self.validator.processed_files]
+        extras = self.processor.open_extra_connections(
+            min(FTP_CONNECTIONS, len(pending)) - 1, self.status_queue)
+        try:
+            run(self.processor.ftp, files, self.status_queue,
+                extra_connections=extras, cancel=self._closing)
+        finally:
+            self.processor.release_connections(extras)
     
     def _validate_selected_worker(self, files):
         """Worker thread for validation"""
         try:
             if not self.processor.connected:
                 self.processor.connect(self.status_queue)
-            
-            self.validator.validate_selected_files(self.processor.ftp, files, self.status_queue)
-            self.status_queue.put(("complete", "complete"))
+            self._run_over_connections(self.validator.validate_selected_files, files)
+            self.status_queue.put(_WORKER_DONE)
         except Exception as e:
             self.status_queue.put((f"🚨 Validation failed: {e}", "error"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
     
     def process_selected(self):
-        """Process selected file (download, validate, archive/reject)"""
+        """Process selected files (download, validate, archive/reject)"""
         if self.is_processing:
             return
         
@@ -867,10 +1379,14 @@ class PAGHClinicalDataManager:
             messagebox.showwarning("No Selection", "Please select a file to process.")
             return
         
-        selected_file = self.displayed_files[selection[0]]
+        selected_files = [self.all_files[self.visible_idx[i]] for i in selection]
+        if len(selected_files) == 1:
+            prompt = f"Process file '{selected_files[0]}'?"
+        else:
+            prompt = f"Process {len(selected_files)} selected files?"
         
         confirm = messagebox.askyesno("Confirm Processing", 
-                                    f"Process file '{selected_file}'?\n\n"
+                                    f"{prompt}\n\n"
                                     "✓ If valid, will be archived with date suffix\n"
                                     "✗ If invalid, will be moved to error folder\n"
                                     "⏭ Already processed files will be skipped")
@@ -883,27 +1399,20 @@ class PAGHClinicalDataManager:
         self.process_btn.config(state=tk.DISABLED, text="⏳ Processing...")
         self.progress.start()
         
-        self.validator = ClinicalDataValidator(
-            self.download_dir.get(),
-            self.archive_dir.get(),
-            self.error_dir.get()
-        )
+        self._get_validator()
         
-        thread = threading.Thread(target=self._process_selected_worker, args=([selected_file],))
-        thread.daemon = True
-        thread.start()
+        self._executor.submit(self._process_selected_worker, selected_files)
     
     def _process_selected_worker(self, files):
         """Worker thread for processing"""
         try:
             if not self.processor.connected:
                 self.processor.connect(self.status_queue)
-            
-            self.validator.process_selected_files(self.processor.ftp, files, self.status_queue)
-            self.status_queue.put(("complete", "complete"))
+            self._run_over_connections(self.validator.process_selected_files, files)
+            self.status_queue.put(_WORKER_DONE)
         except Exception as e:
             self.status_queue.put((f"🚨 Processing failed: {e}", "error"))
-            self.status_queue.put(("complete", "complete"))
+            self.status_queue.put(_WORKER_DONE)
     
     def open_error_log(self):
         """Open error log file"""
@@ -913,7 +1422,9 @@ class PAGHClinicalDataManager:
                 if os.name == 'nt':  # Windows
                     os.startfile(error_log_path)
                 else:  # macOS/Linux
-                    os.system(f'open "{error_log_path}"' if sys.platform == "darwin" else f'xdg-open "{error_log_path}"')
+                    opener = "open" if sys.platform == "darwin" else "xdg-open"
+                    subprocess.Popen([opener, str(error_log_path)], start_new_session=True,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             except Exception as e:
                 messagebox.showerror("Error", f"Could not open error log: {e}")
         else:
@@ -922,6 +1433,16 @@ class PAGHClinicalDataManager:
     def clear_log(self):
         """Clear the activity log"""
         self.log_text.delete(1.0, tk.END)
+    
+    def on_close(self):
+        """Stop background work and release handles when the window closes"""
+        # A running worker stops before its next file; the process exits once it has
+        self._closing.set()
+        self.status_queue.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.validator:
+            self.validator.close()
+        self.root.destroy()
 
 def main():
     """Main application entry point"""
@@ -2,9 +2,10 @@
 
 import unittest
 import tempfile
+import shutil
 import os
 from pathlib import Path
-from datetime import datetime
+import time
 
 class SimpleErrorLogger:
     """Simple error logging class for automation"""
@@ -13,17 +14,36 @@ class SimpleErrorLogger:
         self.log_dir = Path(log_directory)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.log_file = self.log_dir / "errors.log"
-        # Create the file immediately
-        self.log_file.touch()
+        # Create the file immediately and keep it open. Entries are encoded
+        # up front and written unbuffered, one write per entry
+        self._fh = open(self.log_file, 'ab', buffering=0)
+        # Formatted timestamp for the second in _last_sec, reused by every
+        # entry logged within that second
+        self._last_sec = None
+        self._last_ts = b""
+        self._type_bytes = {}  # error_type -> encoded, as types repeat
     
     def log_error(self, error_type, message):
         """Automatically log an error"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        with open(self.log_file, 'a') as f:
-            f.write(f"{timestamp} | {error_type} | {message}\n")
-        
+        now = int(time.time())
+        if now != self._last_sec:
+            self._last_ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)).encode()
+            self._last_sec = now
+        type_bytes = self._type_bytes.get(error_type)
+        if type_bytes is None:
+            type_bytes = self._type_bytes[error_type] = error_type.encode('utf-8')
+        self._fh.write(b"%s | %s | %s\n" % (self._last_ts, type_bytes, message.encode('utf-8')))
         return True
+    
+    def close(self):
+        """Close the log file"""
+        self._fh.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 class TestErrorLoggingAutomation(unittest.TestCase):
     """Automated testing for error logging system - SIMPLIFIED"""
@@ -35,8 +55,8 @@ class TestErrorLoggingAutomation(unittest.TestCase):
     
     def tearDown(self):
         """Clean up test environment"""
-        import shutil
-        shutil.rmtree(self.test_dir)
+        self.logger.close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
     
     def test_1_error_log_file_creation(self):
         """Test 1: Error log file is created automatically"""
@@ -103,6 +123,15 @@ class TestErrorLoggingAutomation(unittest.TestCase):
                         "Error type should match")
         self.assertEqual(message, "Test message", 
                         "Error message should match")
+    
+    def test_5_logger_context_manager(self):
+        """Test 5: Logger closes its file when used as a context manager"""
+        with SimpleErrorLogger(Path(self.test_dir) / "scoped") as logger:
+            logger.log_error("SCOPED_ERROR", "Logged inside with-block")
+        
+        self.assertTrue(logger._fh.closed, "Log file should be closed after the with-block")
+        self.assertIn("SCOPED_ERROR", logger.log_file.read_text(encoding='utf-8'),
+                     "Entry should be written before closing")
 
 def run_tests():
     """Run all tests"""
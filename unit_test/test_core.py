@@ -1,148 +1,563 @@
 import pytest
-from helix import ClinicalDataValidator
-from pathlib import Path
-import tempfile
-import os
+import helix
+from helix import (ClinicalDataProcessor, ClinicalDataValidator, DownloadPipeline, TkStatusQueue,
+                   _csv_rows, _parse_date)
+import io
+import csv
+import shutil
+import threading
+import tracemalloc
 from unittest.mock import Mock, patch
+import ftplib
+import queue
+import time
+from datetime import datetime
 
-class TestClinicalDataValidator:
-    """Test the ClinicalDataValidator class"""
-    
-    def setup_method(self):
-        """Set up test fixtures"""
-        # Create temporary directories for testing
-        self.temp_dir = tempfile.mkdtemp()
-        self.download_dir = Path(self.temp_dir) / "Downloads"
-        self.archive_dir = Path(self.temp_dir) / "Archive"
-        self.error_dir = Path(self.temp_dir) / "Errors"
-        
-        # Create validator instance
-        self.validator = ClinicalDataValidator(
-            self.download_dir,
-            self.archive_dir,
-            self.error_dir
-        )
+VALID_HEADER = ("PatientID", "TrialCode", "DrugCode", "Dosage_mg",
+                "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst")
+VALID_ROWS = (
+    ("PT001", "TRIAL001", "DRUG001", "100", "2024-01-01",
+     "2024-06-01", "Improved", "None", "Analyst1"),
+    ("PT002", "TRIAL001", "DRUG001", "150", "2024-01-02",
+     "2024-06-02", "No Change", "Headache", "Analyst2"),
+)
+VALID_CSV = "".join(",".join(row) + "\n" for row in (VALID_HEADER, *VALID_ROWS))
+
+class FakeFTP:
+    """Minimal stand-in for ftplib.FTP serving files from a dict"""
     
-    def teardown_method(self):
-        """Clean up after tests"""
+    def __init__(self, files, delay=0):
+        self.files = files
+        self.delay = delay
     
-        import shutil
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
+    def retrbinary(self, cmd, callback, blocksize=8192, rest=None):
+        filename = cmd[len("RETR "):]
+        if filename not in self.files:
+            raise ftplib.error_perm(f"550 {filename}: No such file")
+        time.sleep(self.delay)
+        callback(self.files[filename])
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """Download, archive and error directories under the test's tmp_path
     
-    def test_filename_validation_valid(self):
+    Not created here; ClinicalDataValidator makes them on construction.
+    """
+    return tmp_path / "Downloads", tmp_path / "Archive", tmp_path / "Errors"
+
+
+@pytest.fixture
+def validator(dirs):
+    """A validator working in the test's own directory tree"""
+    validator = ClinicalDataValidator(*dirs)
+    yield validator
+    validator.close()
+
+
+@pytest.fixture(scope="session")
+def valid_csv(tmp_path_factory):
+    """A two-record valid CSV, written once and shared by every test"""
+    test_file = tmp_path_factory.mktemp("csvs") / "test_valid.csv"
+    
+    # Built in memory and written in one go; write_bytes keeps csv's \r\n line endings
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(VALID_HEADER)
+    writer.writerows(VALID_ROWS)
+    test_file.write_bytes(buf.getvalue().encode('utf-8'))
+    
+    return test_file
+
+
+@pytest.fixture(scope="session", params=[1_000, 100_000], ids=["1k-rows", "100k-rows"])
+def large_valid_csv(tmp_path_factory, request):
+    """A valid CSV with `request.param` records, as (path, record count)"""
+    rows = request.param
+    test_file = tmp_path_factory.mktemp("large_csvs") / f"valid_{rows}.csv"
+    
+    # Rows are formatted as bytes in one join; only PatientID varies, which keeps them unique
+    row = b"PT%07d,TRIAL001,DRUG001,100,2024-01-01,2024-06-01,Improved,None,Analyst1\n"
+    with open(test_file, 'wb') as f:
+        f.write(",".join(helix._EXPECTED_FIELDS).encode() + b"\n")
+        f.write(b"".join(row % i for i in range(rows)))
+    
+    return test_file, rows
+
+
+class TestFilenameValidation:
+    """Test filename screening, which never changes the validator"""
+    
+    @pytest.mark.parametrize("filename", [
+        "CLINICALDATA_20240101120000.CSV",
+        "CLINICALDATA_20231225143000.csv",
+        "CLINICALDATA_20240115123045.CSV",
+    ])
+    def test_filename_validation_valid(self, shared_validator, filename):
         """Test valid filename pattern"""
-        valid_filenames = [
-            "CLINICALDATA_20240101120000.CSV",
-            "CLINICALDATA_20231225143000.csv",
-            "CLINICALDATA_20240115123045.CSV"
-        ]
-        
-        for filename in valid_filenames:
-            result = self.validator._validate_filename_pattern(filename)
-            assert result == True, f"Filename {filename} should be valid"
+        assert shared_validator._validate_filename_pattern(filename) is True
     
-    def test_filename_validation_invalid(self):
+    @pytest.mark.parametrize("filename", [
+        "CLINICALDATA_20240101.CSV",
+        "DATA_20240101120000.CSV",
+        "CLINICALDATA_20240101120000.TXT",
+        "CLINICALDATA_2024-01-01-120000.CSV",
+        "CLINICALDATA_20240101120000",
+        "20240101120000.CSV",
+        "CLINICALDATA_.CSV",
+        "CLINICALDATA_20240101120000.CSV\n",
+    ], ids=[
+        "short-timestamp", "wrong-prefix", "wrong-extension", "dashed-timestamp",
+        "no-extension", "no-prefix", "no-timestamp", "trailing-newline",
+    ])
+    def test_filename_validation_invalid(self, shared_validator, filename):
         """Test invalid filename patterns"""
-        invalid_filenames = [
-            # "clinicaldata_20240101120000.csv",  
-            "CLINICALDATA_20240101.CSV",  # wrong timestamp length
-            "DATA_20240101120000.CSV",  # wrong prefix
-            "CLINICALDATA_20240101120000.TXT",  # wrong extension
-            "CLINICALDATA_2024-01-01-120000.CSV",  # wrong format
-            "CLINICALDATA_20240101120000",  # no extension
-            "20240101120000.CSV",  # no prefix
-            "CLINICALDATA_.CSV",  # no timestamp
-        ]
-        
-        for filename in invalid_filenames:
-            result = self.validator._validate_filename_pattern(filename)
-            assert result == False, f"Filename {filename} should be invalid"
+        assert shared_validator._validate_filename_pattern(filename) is False
     
-    def test_create_valid_csv_file(self):
-        """Create a valid CSV file for testing"""
-        import csv
-        
-        # Create test CSV file
-        test_file = self.download_dir / "test_valid.csv"
-        self.download_dir.mkdir(parents=True, exist_ok=True)
-        
-        header = ["PatientID", "TrialCode", "DrugCode", "Dosage_mg", 
-                 "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"]
-        
-        data = [
-            ["PT001", "TRIAL001", "DRUG001", "100", "2024-01-01", 
-             "2024-06-01", "Improved", "None", "Analyst1"],
-            ["PT002", "TRIAL001", "DRUG001", "150", "2024-01-02",
-             "2024-06-02", "No Change", "Headache", "Analyst2"],
-        ]
+    @pytest.mark.benchmark(group="filename")
+    def test_filename_validation_benchmark(self, shared_validator, benchmark):
+        """Benchmark screening one listing entry, as done for every selected file"""
+        assert benchmark(shared_validator._validate_filename_pattern, "CLINICALDATA_20240101120000.CSV") is True
+
+
+@pytest.mark.integration
+@pytest.mark.benchmark(group="csv")
+def test_csv_validation_benchmark(shared_validator, valid_csv, benchmark):
+    """Benchmark validating a small file, the fixed cost paid for every download"""
+    benchmark.extra_info["records"] = len(VALID_ROWS)
+    result = benchmark.pedantic(shared_validator._validate_csv_content, args=(valid_csv,),
+                                iterations=1_000, rounds=5)
+    assert result == (True, [], len(VALID_ROWS))
+
+
+class TestCsvAndPersistence:
+    """Test CSV validation, downloads and the processed-files log"""
+    
+    def test_validator_creates_its_directories(self, validator, dirs):
+        """Test construction creates every directory, so tests needn't mkdir them"""
+        assert all(directory.is_dir() for directory in dirs)
+    
+    def test_validator_recreates_deleted_directories(self, validator, dirs):
+        """Test a directory removed while the app runs is made again by the next validator"""
+        shutil.rmtree(dirs[1])
         
-        with open(test_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
-            writer.writerows(data)
+        ClinicalDataValidator(*dirs).close()
         
-        # Store the file path as instance variable instead of returning
-        self.test_file_path = test_file
+        assert dirs[1].is_dir()
     
-    def test_csv_validation_valid(self):
+    @pytest.mark.integration
+    def test_csv_validation_valid(self, validator, valid_csv):
         """Test validation of valid CSV content"""
-        # First call the method that creates the file
-        self.test_create_valid_csv_file()
-        # use the stored file path
-        test_file = self.test_file_path
-        
-        is_valid, errors, record_count = self.validator._validate_csv_content(
-            test_file, 
+        is_valid, errors, record_count = validator._validate_csv_content(
+            valid_csv, 
             status_queue=None
         )
         
         assert is_valid == True, f"Valid CSV should pass validation. Errors: {errors}"
-        assert record_count == 2, f"Should have 2 valid records, got {record_count}"
+        assert record_count == len(VALID_ROWS), f"Should have {len(VALID_ROWS)} valid records, got {record_count}"
         assert len(errors) == 0, f"No errors expected, got: {errors}"
     
-    def test_csv_validation_invalid_header(self):
-        """Test CSV with invalid header"""
-        import csv
+    @pytest.mark.integration
+    def test_csv_validation_large(self, validator, large_valid_csv):
+        """Test validation scales to long files"""
+        test_file, rows = large_valid_csv
         
-        test_file = self.download_dir / "test_invalid_header.csv"
-        self.download_dir.mkdir(parents=True, exist_ok=True)
+        is_valid, errors, record_count = validator._validate_csv_content(test_file)
         
-        # Wrong header
-        header = ["PatientID", "WrongField", "DrugCode", "Dosage_mg", 
-                 "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"]
+        assert is_valid is True, errors[:5]
+        assert record_count == rows
+    
+    @pytest.mark.integration
+    def test_csv_validation_large_streaming(self, validator, tmp_path):
+        """Test rows are checked as they are read rather than held in memory"""
+        # Long SideEffects values make the file large while the duplicate-check keys stay small
+        row = b"PT%07d,TRIAL001,DRUG001,100,2024-01-01,2024-06-01,Improved," + b"x" * 2000 + b",Analyst1\n"
+        test_file = tmp_path / "large.csv"
+        test_file.write_bytes(",".join(helix._EXPECTED_FIELDS).encode() + b"\n"
+                              + b"".join(row % i for i in range(10_000)))
         
-        with open(test_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(header)
+        tracemalloc.start()
+        try:
+            is_valid, errors, record_count = validator._validate_csv_content(test_file)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
         
-        is_valid, errors, record_count = self.validator._validate_csv_content(
-            test_file, 
+        assert is_valid is True, errors[:5]
+        assert record_count == 10_000
+        assert peak < test_file.stat().st_size / 4
+    
+    @pytest.mark.parametrize("header", [
+        ["PatientID", "WrongField", "DrugCode", "Dosage_mg",
+         "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"],
+        ["PatientID", "TrialCode", "DrugCode", "Dosage_mg",
+         "StartDate", "EndDate", "Outcome", "SideEffects"],
+        ["PatientID", "TrialCode", "DrugCode", "Dosage_mg",
+         "StartDate", "EndDate", "Outcome", "SideEfects", "Analyst"],
+        ["PatientID", "TrialCode", "DrugCode", "Dosage_mg",
+         "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst", "Notes"],
+        ["TrialCode", "PatientID", "DrugCode", "Dosage_mg",
+         "StartDate", "EndDate", "Outcome", "SideEffects", "Analyst"],
+        ["patientid", "trialcode", "drugcode", "dosage_mg",
+         "startdate", "enddate", "outcome", "sideeffects", "analyst"],
+        [],
+    ], ids=["wrong-field", "missing", "misspelled", "extra", "reordered", "lowercase", "empty"])
+    def test_csv_validation_invalid_header(self, validator, header):
+        """Test CSV with invalid header"""
+        content = io.BytesIO((",".join(header) + "\n" + VALID_CSV.split("\n", 1)[1]).encode())
+        
+        is_valid, errors, record_count = validator._validate_csv_content(
+            content, 
             status_queue=None
         )
         
         assert is_valid == False, "Invalid header should fail validation"
-        assert "Invalid header" in str(errors)
+        assert [error.code for error in errors] == ["HEADER_MISMATCH"]
+    
+    def test_csv_validation_stops_at_error_cap(self, validator):
+        """Test scanning stops once max_errors row errors are found"""
+        bad_rows = "PT001,TRIAL001,DRUG001,-5,2024-01-01,2024-06-01,Improved,None,Analyst1\n" * 10
+        content = io.BytesIO((VALID_CSV + bad_rows).encode())
+        
+        is_valid, errors, record_count = validator._validate_csv_content(content, max_errors=3)
+        
+        assert is_valid is False
+        assert record_count == len(VALID_ROWS)
+        assert len(errors) == 4
+        assert [error.code for error in errors] == ["INVALID_RECORD"] * 3 + ["TRUNCATED"]
+        assert errors[-1].message.startswith("Validation stopped after 3 errors")
     
-    def test_processed_files_logging(self):
+    @pytest.mark.xdist_group("persistence")
+    def test_processed_files_logging(self, validator, dirs):
         """Test that processed files are logged correctly"""
         test_filename = "CLINICALDATA_20240101120000.CSV"
         
         # Initially not processed
-        assert test_filename not in self.validator.processed_files
+        assert test_filename not in validator.processed_files
         
         # Mark as processed
-        self.validator._save_processed_file(test_filename)
+        validator._save_processed_file(test_filename)
         
         # Should now be in processed files
-        assert test_filename in self.validator.processed_files
+        assert test_filename in validator.processed_files
         
         # Create new validator instance to test persistence
-        validator2 = ClinicalDataValidator(
-            self.download_dir,
-            self.archive_dir,
-            self.error_dir
-        )
+        validator2 = ClinicalDataValidator(*dirs)
         
         # Should load previously processed files
-        assert test_filename in validator2.processed_files
\ No newline at end of file
+        assert test_filename in validator2.processed_files
+    
+    def test_download_pipeline_preserves_order(self, tmp_path):
+        """Test parallel downloads are handed back in request order"""
+        files = {f"file{i}.csv": f"content {i}".encode() for i in range(6)}
+        connections = [FakeFTP(files, delay=0.02), FakeFTP(files)]
+        requested = list(files) + ["missing.csv"]
+        
+        with DownloadPipeline(connections, requested, tmp_path, buffer_size=2) as downloads:
+            results = [downloads.next_download() for _ in requested]
+        
+        assert [name for name, _, _ in results] == requested
+        for name, path, error in results[:-1]:
+            assert error is None
+            assert path.read_bytes() == files[name]
+        assert isinstance(results[-1][2], ftplib.error_perm)
+    
+    def test_download_pipeline_uses_every_connection(self, tmp_path):
+        """Test the default buffer still lets all connections download at once"""
+        files = {f"file{i}.csv": b"data" for i in range(helix.FTP_CONNECTIONS)}
+        # Each transfer waits until all of them are in flight at the same time
+        all_busy = threading.Barrier(helix.FTP_CONNECTIONS, timeout=5)
+        
+        class BarrierFTP(FakeFTP):
+            def retrbinary(self, cmd, callback, blocksize=8192, rest=None):
+                all_busy.wait()
+                super().retrbinary(cmd, callback, blocksize, rest)
+        
+        connections = [BarrierFTP(files) for _ in range(helix.FTP_CONNECTIONS)]
+        with DownloadPipeline(connections, list(files), tmp_path) as downloads:
+            results = [downloads.next_download() for _ in files]
+        
+        assert [error for _, _, error in results] == [None] * len(files)
+    
+    def test_download_pipeline_spills_large_files(self, tmp_path):
+        """Test downloads stay in memory up to memory_limit and spill to disk beyond it"""
+        files = {"small.csv": b"12345", "large.csv": b"0123456789"}
+        
+        with DownloadPipeline([FakeFTP(files)], list(files), tmp_path,
+                              prefix="temp_", memory_limit=5) as downloads:
+            (_, small, _), (_, large, _) = downloads.next_download(), downloads.next_download()
+        
+        assert isinstance(small, io.BytesIO) and small.read() == files["small.csv"]
+        assert large == tmp_path / "temp_large.csv"
+        assert large.read_bytes() == files["large.csv"]
+    
+    def test_validate_selected_files_dry_run(self, validator, dirs):
+        """Test dry-run validation reports results without writing downloads to disk"""
+        ftp = FakeFTP({
+            "CLINICALDATA_20240101120000.CSV": VALID_CSV.encode(),
+            "CLINICALDATA_20240102120000.CSV": b"wrong,header\n",
+        })
+        status_queue = queue.Queue()
+        
+        validator.validate_selected_files(
+            ftp, ["CLINICALDATA_20240101120000.CSV", "CLINICALDATA_20240102120000.CSV"], status_queue)
+        
+        messages = [message for message, _ in list(status_queue.queue)]
+        assert "📊 Results: 1 valid, 1 invalid" in messages
+        assert not list(dirs[0].glob("*.CSV"))
+    
+    def test_process_selected_files_archives_and_rejects(self, validator, dirs):
+        """Test processing archives valid files, rejects invalid ones and leaves no downloads"""
+        ftp = FakeFTP({
+            "CLINICALDATA_20240101120000.CSV": VALID_CSV.encode(),
+            "CLINICALDATA_20240102120000.CSV": b"wrong,header\n",
+        })
+        status_queue = queue.Queue()
+        
+        with patch.object(ClinicalDataValidator, "_api_healthy", False):
+            validator.process_selected_files(
+                ftp, ["CLINICALDATA_20240101120000.CSV", "CLINICALDATA_20240102120000.CSV",
+                      "CLINICALDATA_20240103120000.CSV"], status_queue)
+        
+        download_dir, archive_dir, error_dir = dirs
+        messages = [message for message, _ in list(status_queue.queue)]
+        assert "📊 Summary: 1 archived, 2 rejected" in messages
+        assert len(list(archive_dir.glob("CLINICALDATA_20240101120000_*.CSV"))) == 1
+        assert (error_dir / "CLINICALDATA_20240102120000.CSV").exists()
+        assert not list(download_dir.glob("*.CSV"))
+        assert validator.processed_files == {"CLINICALDATA_20240101120000.CSV"}
+    
+    def test_process_stops_before_next_file_when_cancelled(self, validator, dirs):
+        """Test a set cancel event stops processing without touching any file"""
+        ftp = FakeFTP({"CLINICALDATA_20240101120000.CSV": VALID_CSV.encode()})
+        status_queue = queue.Queue()
+        cancel = threading.Event()
+        cancel.set()
+        
+        validator.process_selected_files(ftp, ["CLINICALDATA_20240101120000.CSV"], status_queue,
+                                         cancel=cancel)
+        
+        messages = [message for message, _ in list(status_queue.queue)]
+        assert "📊 Summary: 0 archived, 0 rejected" in messages
+        assert not any(list(directory.iterdir()) for directory in dirs[1:])
+        assert validator.processed_files == set()
+    
+    def test_truncated_validation_reports_open_ended_count(self, validator):
+        """Test a file cut off at the error cap is reported as 100+ errors, not 101"""
+        bad_rows = "PT001,TRIAL001,DRUG001,-5,2024-01-01,2024-06-01,Improved,None,Analyst1\n" * 150
+        ftp = FakeFTP({"CLINICALDATA_20240101120000.CSV": (VALID_CSV + bad_rows).encode()})
+        status_queue = queue.Queue()
+        
+        validator.validate_selected_files(ftp, ["CLINICALDATA_20240101120000.CSV"], status_queue)
+        with patch.object(ClinicalDataValidator, "_api_healthy", False):
+            validator.process_selected_files(ftp, ["CLINICALDATA_20240101120000.CSV"], status_queue)
+        
+        messages = [message for message, _ in list(status_queue.queue)]
+        assert "❌ INVALID: CLINICALDATA_20240101120000.CSV (100+ errors)" in messages
+        assert "  ❌ Rejected (100+ errors)" in messages
+        assert "    • ... and 97+ more errors" in messages
+    
+    @pytest.mark.xdist_group("persistence")
+    def test_processed_files_log_is_append_only(self, validator, dirs):
+        """Test saving appends to a log written without a trailing newline"""
+        validator.processed_files_log.write_text("CLINICALDATA_20240101120000.CSV")
+        reopened = ClinicalDataValidator(*dirs)
+        
+        reopened._save_processed_file("CLINICALDATA_20240102120000.CSV")
+        reopened._save_processed_file("CLINICALDATA_20240102120000.CSV")
+        reopened.close()
+        
+        assert validator.processed_files_log.read_text().splitlines() == [
+            "CLINICALDATA_20240101120000.CSV",
+            "CLINICALDATA_20240102120000.CSV",
+        ]
+
+
+def test_open_extra_connections_stops_at_first_failure():
+    """Test extra connections fall back to fewer when the server refuses one"""
+    processor = ClinicalDataProcessor("ftp.example.com", "user", "pass")
+    opened = [Mock(), ftplib.error_temp("421 Too many connections"), Mock()]
+    status_queue = queue.Queue()
+    
+    with patch.object(processor, "_open_ftp", side_effect=opened):
+        connections = processor.open_extra_connections(3, status_queue)
+    
+    assert connections == opened[:1]
+    assert status_queue.get_nowait()[1] == "warning"
+    
+    ClinicalDataProcessor.close_connections(connections)
+    connections[0].quit.assert_called_once()
+
+
+@pytest.mark.parametrize("value", [
+    "2024-01-15", "2024-02-29", "2024-1-5", "2024-02-30", "2023-02-29",
+    "2024/01/15", "2024-01-1a", "+024-01-15", "2024-01-15 ", "",
+])
+def test_parse_date_matches_strptime(value):
+    """Test the fast date parser accepts and rejects exactly what strptime does"""
+    try:
+        expected = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        with pytest.raises(ValueError):
+            _parse_date(value)
+    else:
+        assert _parse_date(value) == expected
+
+
+def test_get_file_list_returns_sorted_csv_files():
+    """Test the listing keeps only CSV files, sorted, and is fetched fresh on every call"""
+    processor = ClinicalDataProcessor("ftp.example.com", "user", "pass")
+    processor.ftp = Mock()
+    processor.ftp.mlsd.side_effect = lambda facts: iter([
+        ("b.csv", {"type": "file"}), ("A.CSV", {"type": "file"}), ("notes.txt", {"type": "file"}),
+    ])
+    processor.connected = True
+    
+    assert processor.get_file_list() == ["A.CSV", "b.csv"]
+    assert processor.get_file_list() == ["A.CSV", "b.csv"]
+    assert processor.ftp.mlsd.call_count == 2
+
+
+def test_get_file_list_skips_directories_and_falls_back_to_nlst():
+    """Test MLSD entries that aren't files are dropped, and NLST is used without MLSD"""
+    processor = ClinicalDataProcessor("ftp.example.com", "user", "pass")
+    processor.ftp = Mock()
+    processor.ftp.mlsd.return_value = iter([("OLD.CSV", {"type": "dir"}), ("A.CSV", {"type": "file"})])
+    processor.connected = True
+    
+    assert processor.get_file_list() == ["A.CSV"]
+    
+    processor.ftp.mlsd.side_effect = ftplib.error_perm("500 Unknown command")
+    processor.ftp.nlst.return_value = ["B.CSV"]
+    assert processor.get_file_list() == ["B.CSV"]
+    assert processor.get_file_list() == ["B.CSV"]
+    assert processor.ftp.mlsd.call_count == 2
+
+
+@pytest.mark.parametrize("content", [
+    "a,b,c\r\nd,e,f\r\n",
+    "a,b\n\n,\nlast",
+    "a,\"b,c\",d\ne,f\n",
+    "a,\"multi\nline\",b\r\nc\r\n",
+    "a\rb\r\n\r\n",
+    "",
+])
+def test_csv_rows_matches_csv_reader(content):
+    """Test the split fast path yields exactly what csv.reader does"""
+    assert list(_csv_rows(io.StringIO(content, newline=''))) == list(csv.reader(io.StringIO(content, newline='')))
+
+
+def test_status_queue_schedules_one_wakeup_per_drain():
+    """Test puts wake the GUI once, and again only after it starts draining"""
+    root = Mock()
+    status_queue = TkStatusQueue(root, on_message="drain")
+    
+    status_queue.put(("first", "info"))
+    status_queue.put(("second", "info"))
+    root.after_idle.assert_called_once_with("drain")
+    
+    assert status_queue.drain() == [("first", "info"), ("second", "info")]
+    status_queue.put(("third", "info"))
+    assert root.after_idle.call_count == 2
+    assert status_queue.qsize() == 1
+
+
+def test_extra_connection_closed_when_remote_dir_fails():
+    """Test a connection that logs in but can't enter the remote dir isn't leaked"""
+    processor = ClinicalDataProcessor("ftp.example.com", "user", "pass", remote_dir="incoming")
+    ftp = Mock()
+    ftp.cwd.side_effect = ftplib.error_perm("550 No such directory")
+    status_queue = queue.Queue()
+    
+    with patch.object(processor, "_open_ftp", return_value=ftp):
+        connections = processor.open_extra_connections(2, status_queue)
+    
+    assert connections == []
+    ftp.quit.assert_called_once()
+    assert status_queue.get_nowait()[1] == "warning"
+
+
+def test_check_queue_waits_for_worker_done():
+    """Test per-file errors mid-run don't re-enable the buttons; the worker's done marker does"""
+    manager = Mock(is_processing=True, _watchdog_job=None)
+    manager.status_queue.drain.return_value = [("❌ INVALID: a.csv", "error"), ("✅ Validation complete!", "complete")]
+    
+    helix.PAGHClinicalDataManager.check_queue(manager)
+    assert manager.is_processing is True
+    manager.validate_btn.config.assert_not_called()
+    
+    manager.status_queue.drain.return_value = [("📊 Results: 1 valid, 1 invalid", "summary"), helix._WORKER_DONE]
+    helix.PAGHClinicalDataManager.check_queue(manager)
+    assert manager.is_processing is False
+    manager.validate_btn.config.assert_called_once()
+    assert None not in manager.log_text.insert.call_args.args
+
+
+def test_status_queue_after_close_drops_puts():
+    """Test workers can still put once the window is gone without reaching Tk"""
+    root = Mock()
+    status_queue = TkStatusQueue(root, on_message="drain")
+    status_queue.close()
+    
+    status_queue.put(("late", "info"))
+    assert status_queue.qsize() == 0
+    root.after_idle.assert_not_called()
+    
+    root.after_idle.side_effect = RuntimeError("main thread is not in main loop")
+    status_queue = TkStatusQueue(root, on_message="drain")
+    status_queue.put(("racing", "info"))
+    assert status_queue.qsize() == 1
+
+
+def test_new_listing_replaces_files_and_filter_state_together():
+    """Test a refreshed listing is filtered against its own index, not the previous list's"""
+    manager = Mock(all_files=["a.csv", "b.csv", "c.csv"], _filter_job=None)
+    manager.search_var.get.return_value = "b"
+    helix.PAGHClinicalDataManager.update_file_listbox(manager, ["a.csv", "c.csv", "B.CSV", "d.csv"])
+    helix.PAGHClinicalDataManager.filter_file_list(manager)
+    
+    assert [manager.all_files[i] for i in manager.visible_idx] == ["B.CSV"]
+    manager.file_listbox.insert.assert_called_with(helix.tk.END, "B.CSV")
+
+
+def test_direct_filter_cancels_pending_debounced_run():
+    """Test pressing Enter after typing filters once, not again when the debounce fires"""
+    manager = Mock(all_files=["a.csv"], all_files_folded=["a.csv"], visible_idx=range(1),
+                   _filter_term="", _filter_job="after#1")
+    manager.search_var.get.return_value = "a"
+    
+    helix.PAGHClinicalDataManager.filter_file_list(manager)
+    
+    manager.root.after_cancel.assert_called_once_with("after#1")
+    assert manager._filter_job is None
+
+
+def test_extra_connections_sized_from_files_still_to_download():
+    """Test duplicates and already processed files don't open extra FTP connections"""
+    manager = Mock()
+    manager.validator.processed_files = {"c.csv"}
+    extras = manager.processor.open_extra_connections.return_value
+    run = Mock(side_effect=ftplib.error_temp("421 Timeout"))
+    files = ["a.csv", "a.csv", "b.csv", "c.csv", "c.csv"]
+    
+    with pytest.raises(ftplib.error_temp):
+        helix.PAGHClinicalDataManager._run_over_connections(manager, run, files)
+    
+    manager.processor.open_extra_connections.assert_called_once_with(1, manager.status_queue)
+    run.assert_called_once_with(manager.processor.ftp, files, manager.status_queue,
+                                extra_connections=extras, cancel=manager._closing)
+    manager.processor.release_connections.assert_called_once_with(extras)
+    
+
+def test_released_connections_are_reused_while_alive():
+    """Test idle connections are handed out again only if they answer NOOP"""
+    processor = ClinicalDataProcessor("ftp.example.com", "user", "pass")
+    alive, dead, fresh = Mock(), Mock(), Mock()
+    dead.voidcmd.side_effect = EOFError
+    processor.release_connections([alive, dead])
+    
+    with patch.object(processor, "_open_ftp", return_value=fresh):
+        connections = processor.open_extra_connections(2)
+    
+    assert connections == [alive, fresh]
+    dead.close.assert_called_once()